@@ -1,63 +1,534 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import collections
+import contextlib
+import ctypes
 import json
 import logging
+import numpy
 import pyfmodex as fmod
 import sys
 import time
 import uuid
+import weakref
 
 default_logger = logging.getLogger('ear')
 
+DEFAULT_RECIPE_CACHE_BYTES = 4 * 1024 * 1024
+DEFAULT_SOUND_CACHE_BYTES = 256 * 1024 * 1024
+MAX_DSP_CLOCK = 2 ** 64 - 1
+
 class Matrix(object):
+	"""
+	Mix matrix backed by one contiguous float32 buffer laid out the way FMOD
+	expects it (one row per output, one column per input), so it can be handed
+	to set_mix_matrix without building intermediate lists.
+	"""
+
 	def __init__(self, inputs, outputs, assign=0):
 		self.inputs = inputs
 		self.outputs = outputs
-		self.matrix = [[assign for x in range(inputs)] for y in range(outputs)]
+		self.matrix = numpy.full((outputs, inputs), assign, dtype=numpy.float32)
+
+	@property
+	def _as_parameter_(self):
+		return self.matrix.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+
+	def __len__(self):
+		return self.matrix.size
 
 	def fill(self, matrix):
 		if len(matrix) != self.inputs:
 			raise Exception("Inputs length does not match matrix")
 
-		for input in range(self.inputs):
-			if len(matrix[input]) != self.outputs:
-				raise Exception("Outputs length does not match matrix")
+		try:
+			values = numpy.asarray(matrix, dtype=numpy.float32)
+		except ValueError:
+			raise Exception("Outputs length does not match matrix")
 
-		self.matrix = matrix
+		if values.shape != (self.inputs, self.outputs):
+			raise Exception("Outputs length does not match matrix")
+
+		self.matrix[...] = values.T
 
 	def flatten(self):
-		return [y for x in self.matrix for y in x]
+		return self.matrix.T.flatten().tolist()
+
+	def input_view(self, input):
+		"""Writable view over the gains of one input across all outputs"""
+		return self.matrix[:, input]
+
+	def output_view(self, output):
+		"""Writable view over the gains of all inputs feeding one output"""
+		return self.matrix[output]
 
 	def set_input_vector(self, input, outputs):
-		if len(outputs) != self.outputs:
+		outputs = numpy.asarray(outputs, dtype=numpy.float32)
+		if outputs.shape != (self.outputs,):
 			raise Exception("Outputs length does not match expected")
 
-		self.matrix[input] = outputs
+		self.matrix[:, input] = outputs
 
 	def set_input(self, input, output, value):
-		self.matrix[input][output] = value
+		self.matrix[output, input] = value
 
 	def get_input_vector(self, input):
-		return self.matrix[input]
+		return self.matrix[:, input].tolist()
 
 	def set_output_vector(self, output, inputs):
-		if len(inputs) != self.inputs:
+		inputs = numpy.asarray(inputs, dtype=numpy.float32)
+		if inputs.shape != (self.inputs,):
 			raise Exception("Inputs length does not match expected")
 
-		for i in range(self.inputs):
-			self.matrix[i][output] = inputs[i]
+		self.matrix[output] = inputs
 
 	def set_output(self, output, input, value):
-		self.matrix[input][output] = value
+		self.matrix[output, input] = value
 
 	def get_output_vector(self, output):
-		inputs = []
+		return self.matrix[output].tolist()
+
+class SparseMatrix(object):
+	"""
+	Mix matrix stored as compressed sparse rows, one row per output
+
+	Meant for building and diffing mixes that only touch a few outputs.
+	It is only expanded to the dense FMOD layout when uploaded, and then only
+	for the outputs that changed since the previous upload.
+	"""
+
+	def __init__(self, inputs, outputs):
+		self.inputs = inputs
+		self.outputs = outputs
+
+		self.indptr = numpy.zeros(outputs + 1, dtype=numpy.intp)
+		self.indices = numpy.empty(0, dtype=numpy.intp)
+		self.data = numpy.empty(0, dtype=numpy.float32)
+
+	@classmethod
+	def from_dense(cls, matrix):
+		"""Build from a Matrix or an (outputs, inputs) array"""
+		if isinstance(matrix, Matrix):
+			matrix = matrix.matrix
+
+		matrix = numpy.asarray(matrix, dtype=numpy.float32)
+		outputs, inputs = matrix.shape
+		sparse = cls(inputs, outputs)
+
+		rows, cols = numpy.nonzero(matrix)
+		sparse.indptr[1:] = numpy.cumsum(numpy.bincount(rows, minlength=outputs))
+		sparse.indices = cols.astype(numpy.intp)
+		sparse.data = matrix[rows, cols]
+
+		return sparse
+
+	@property
+	def nnz(self):
+		return len(self.data)
+
+	def copy(self):
+		sparse = SparseMatrix(self.inputs, self.outputs)
+		sparse.indptr = self.indptr.copy()
+		sparse.indices = self.indices.copy()
+		sparse.data = self.data.copy()
+
+		return sparse
+
+	def set_output_vector(self, output, inputs):
+		inputs = numpy.asarray(inputs, dtype=numpy.float32)
+		if inputs.shape != (self.inputs,):
+			raise Exception("Inputs length does not match expected")
+
+		cols = numpy.flatnonzero(inputs)
+		start, end = self.indptr[output], self.indptr[output + 1]
+
+		self.indices = numpy.concatenate((self.indices[:start], cols, self.indices[end:]))
+		self.data = numpy.concatenate((self.data[:start], inputs[cols], self.data[end:]))
+		self.indptr[output + 1:] += len(cols) - (end - start)
+
+	def get_output_vector(self, output):
+		inputs = numpy.zeros(self.inputs, dtype=numpy.float32)
+		start, end = self.indptr[output], self.indptr[output + 1]
+		inputs[self.indices[start:end]] = self.data[start:end]
+
+		return inputs.tolist()
+
+	def set_output_vectors(self, outputs, rows):
+		"""
+		Replace the gains of several distinct outputs, rows being an
+		(len(outputs), inputs) array, rebuilding the arrays only once
+		"""
+		outputs = numpy.asarray(outputs, dtype=numpy.intp)
+		rows = numpy.asarray(rows, dtype=numpy.float32)
+		if rows.shape != (len(outputs), self.inputs):
+			raise Exception("Rows do not match outputs and inputs")
+
+		mask = rows != 0
+		new_counts = numpy.count_nonzero(mask, axis=1)
+
+		counts = numpy.diff(self.indptr)
+		replaced = numpy.zeros(self.outputs, dtype=bool)
+		replaced[outputs] = True
+		counts[outputs] = new_counts
+
+		indptr = numpy.zeros(self.outputs + 1, dtype=numpy.intp)
+		numpy.cumsum(counts, out=indptr[1:])
+		indices = numpy.empty(indptr[-1], dtype=numpy.intp)
+		data = numpy.empty(indptr[-1], dtype=numpy.float32)
+
+		# Entries keep their order within a row, so each only moves by its row's new offset
+		if not replaced.all():
+			old_rows = numpy.repeat(numpy.arange(self.outputs), numpy.diff(self.indptr))
+			keep = numpy.flatnonzero(~replaced[old_rows])
+			kept_rows = old_rows[keep]
+			dest = keep - self.indptr[kept_rows] + indptr[kept_rows]
+			indices[dest] = self.indices[keep]
+			data[dest] = self.data[keep]
+
+		dest = indptr[outputs][:, None] + numpy.cumsum(mask, axis=1) - 1
+		dest = dest[mask]
+		indices[dest] = numpy.broadcast_to(numpy.arange(self.inputs), rows.shape)[mask]
+		data[dest] = rows[mask]
+
+		self.indptr = indptr
+		self.indices = indices
+		self.data = data
+
+	def set_output(self, output, input, value):
+		inputs = numpy.array(self.get_output_vector(output), dtype=numpy.float32)
+		inputs[input] = value
+		self.set_output_vector(output, inputs)
+
+	def _keys(self):
+		rows = numpy.repeat(numpy.arange(self.outputs), numpy.diff(self.indptr))
+		return rows * self.inputs + self.indices
+
+	def changed_outputs(self, other):
+		"""Return the outputs whose gains differ bitwise from other"""
+		if (self.inputs, self.outputs) != (other.inputs, other.outputs):
+			raise Exception("Matrix dimensions do not match")
+
+		keys = self._keys()
+		other_keys = other._keys()
+		all_keys = numpy.union1d(keys, other_keys)
+
+		values = numpy.zeros(len(all_keys), dtype=numpy.float32)
+		values[numpy.searchsorted(all_keys, keys)] = self.data
+		other_values = numpy.zeros(len(all_keys), dtype=numpy.float32)
+		other_values[numpy.searchsorted(all_keys, other_keys)] = other.data
+
+		changed = all_keys[values.view(numpy.uint32) != other_values.view(numpy.uint32)]
+		return numpy.unique(changed // self.inputs)
+
+	def to_dense(self, matrix=None, outputs=None):
+		"""
+		Expand into a dense Matrix, writing only the given outputs when provided
+
+		matrix may have more inputs than this one, in which case only its
+		leading columns are written.
+		"""
+		if matrix is None:
+			matrix = Matrix(self.inputs, self.outputs)
+
+		if outputs is None:
+			outputs = numpy.arange(self.outputs)
+
+		dense = matrix.matrix
+		dense[outputs, :self.inputs] = 0
+
+		for output in outputs:
+			start, end = self.indptr[output], self.indptr[output + 1]
+			dense[output, self.indices[start:end]] = self.data[start:end]
+
+		return matrix
+
+	def upload(self, control, dense=None, previous=None):
+		"""
+		Push to a ChannelControl or DSPConnection through a dense buffer
+
+		When the dense buffer from the previous upload and the matrix uploaded
+		then are passed, only the changed outputs are rewritten and FMOD is not
+		called at all if nothing changed. The buffer may be wider than this
+		matrix, its row stride is passed to FMOD as the matrix hop.
+		"""
+		if dense is None or previous is None:
+			dense = self.to_dense(dense)
+		else:
+			outputs = self.changed_outputs(previous)
+			if not len(outputs):
+				return dense
+			self.to_dense(dense, outputs)
+
+		control.set_mix_matrix(dense, self.outputs, self.inputs, dense.inputs)
+		return dense
 
-		for i in range(self.inputs):
-			inputs.append(self.matrix[i][output])
+class MixRecipeCache(object):
+	"""
+	Bounded LRU cache of ready to upload mix matrices
 
-		return inputs
+	Entries are evicted least recently used first once the float buffers held
+	exceed max_bytes. Cached matrices are shared, callers must not modify them.
+	"""
+
+	def __init__(self, max_bytes=DEFAULT_RECIPE_CACHE_BYTES):
+		self.max_bytes = max_bytes
+		self.bytes = 0
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		self._recipes = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self._recipes)
+
+	def __contains__(self, key):
+		return key in self._recipes
+
+	def get(self, key, build):
+		"""Return the matrix cached under key, calling build() to create it on a miss"""
+		matrix = self._recipes.get(key)
+		if matrix is not None:
+			self._recipes.move_to_end(key)
+			self.hits += 1
+			return matrix
+
+		self.misses += 1
+		matrix = build()
+
+		size = matrix.matrix.nbytes
+		if size > self.max_bytes:
+			return matrix
+
+		while self.bytes + size > self.max_bytes:
+			_, evicted = self._recipes.popitem(last=False)
+			self.bytes -= evicted.matrix.nbytes
+			self.evictions += 1
+
+		self._recipes[key] = matrix
+		self.bytes += size
+
+		return matrix
+
+	def clear(self):
+		self._recipes.clear()
+		self.bytes = 0
+
+	def stats(self):
+		return {
+			'entries': len(self._recipes),
+			'bytes': self.bytes,
+			'max_bytes': self.max_bytes,
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions
+		}
+
+class CachedSound(object):
+	"""A cached sound with the memory it was measured to take and the channels it was played on"""
+
+	def __init__(self, sound, size, cached=True):
+		self.sound = sound
+		self.size = size
+		self.cached = cached
+		self.channels = []
+
+	def is_playing(self):
+		"""Drop channels that finished, and return whether any are left"""
+		playing = []
+		for channel in self.channels:
+			try:
+				if channel.is_playing:
+					playing.append(channel)
+			except fmod.FmodError:
+				# Stopped or stolen channels are invalid handles
+				pass
+
+		self.channels = playing
+		return bool(playing)
+
+class SoundCache(object):
+	"""
+	Opened sounds keyed by (path, mode, exinfo)
+
+	The memory a sound takes is measured as the growth of FMOD's memory
+	stats and sound RAM while creating it. Once the total exceeds max_bytes,
+	the least recently played sounds that are not playing are released.
+	Sounds still playing are never evicted, so the budget can be exceeded
+	while they are.
+
+	A sound larger than max_bytes on its own is never cached. play releases
+	it once its channel stops, get and load hand it to the caller to release.
+	"""
+
+	def __init__(self, fmod_system, max_bytes=DEFAULT_SOUND_CACHE_BYTES):
+		self.fmod_system = fmod_system
+		self.max_bytes = max_bytes
+		self.bytes = 0
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		self._sounds = collections.OrderedDict()
+		self._loading = {}
+		# Played sounds too large to cache, released once they stop
+		self._uncached = []
+
+	def __len__(self):
+		return len(self._sounds)
+
+	def __contains__(self, key):
+		return key in self._sounds
+
+	@staticmethod
+	def key(path, mode=None, exinfo=None):
+		"""Cache key of a sound, exinfo is compared by content"""
+		return (path, None if mode is None else int(mode), None if exinfo is None else bytes(exinfo))
+
+	def _memory(self):
+		return fmod.get_memory_stats(False).current + self.fmod_system.sound_ram.current
+
+	def _hit(self, key):
+		entry = self._sounds.get(key)
+		if entry is not None:
+			self._sounds.move_to_end(key)
+			self.hits += 1
+		return entry
+
+	def _add(self, key, sound, size):
+		size = max(size, 0)
+		if size > self.max_bytes:
+			return CachedSound(sound, size, cached=False)
+
+		# Evict first, so the new sound is never the one released
+		self._evict(size)
+
+		entry = CachedSound(sound, size)
+		self._sounds[key] = entry
+		self.bytes += entry.size
+
+		return entry
+
+	def _entry(self, path, mode, exinfo):
+		key = self.key(path, mode, exinfo)
+		entry = self._hit(key)
+		if entry is not None:
+			return entry
+
+		self.misses += 1
+
+		args = {} if mode is None else {'mode': mode}
+		before = self._memory()
+		sound = self.fmod_system.create_sound(path, exinfo=exinfo, **args)
+		return self._add(key, sound, self._memory() - before)
+
+	def _evict(self, size=0):
+		"""Release sounds that are not playing until size more bytes fit in the budget"""
+		for key in list(self._sounds):
+			if self.bytes + size <= self.max_bytes:
+				break
+
+			entry = self._sounds[key]
+			if entry.is_playing():
+				continue
+
+			del self._sounds[key]
+			entry.sound.release()
+			self.bytes -= entry.size
+			self.evictions += 1
+
+	def get(self, path, mode=None, exinfo=None):
+		"""Return the sound for path, creating it on a miss. mode defaults to create_sound's"""
+		return self._entry(path, mode, exinfo).sound
+
+	async def load(self, path, mode=None, exinfo=None):
+		"""
+		Return the sound for path, opening it on FMOD's loading thread on a miss
+
+		Concurrent loads of the same sound share one. Sizes are measured
+		around the whole load, so they are only approximate while several
+		sounds load at once.
+		"""
+		key = self.key(path, mode, exinfo)
+		entry = self._hit(key)
+		if entry is not None:
+			return entry.sound
+
+		loading = self._loading.get(key)
+		if loading is None:
+			self.misses += 1
+			loading = asyncio.ensure_future(self._load(key, path, mode, exinfo))
+			self._loading[key] = loading
+
+		# A cancelled caller leaves the load running for the others and the cache
+		return await asyncio.shield(loading)
+
+	async def _load(self, key, path, mode, exinfo):
+		args = {} if mode is None else {'mode': mode}
+		try:
+			before = self._memory()
+			sound = await self.fmod_system.load_sound(path, exinfo=exinfo, **args)
+			size = self._memory() - before
+
+			# get or play may have created the sound while this one was loading
+			entry = self._sounds.get(key)
+			if entry is not None:
+				sound.release()
+				return entry.sound
+
+			return self._add(key, sound, size).sound
+		finally:
+			del self._loading[key]
+
+	def _release_uncached(self):
+		playing = []
+		for entry in self._uncached:
+			if entry.is_playing():
+				playing.append(entry)
+			else:
+				entry.sound.release()
+
+		self._uncached = playing
+
+	def play(self, path, channel_group=None, paused=False, mode=None, exinfo=None):
+		"""Play the sound for path, creating it on a miss, and return the channel"""
+		self._release_uncached()
+
+		entry = self._entry(path, mode, exinfo)
+		channel = entry.sound.play(channel_group, paused)
+		# Drop finished channels here too, a cue retriggered under budget never reaches _evict
+		entry.is_playing()
+		entry.channels.append(channel)
+
+		if not entry.cached:
+			self._uncached.append(entry)
+
+		return channel
+
+	def clear(self):
+		"""Release every cached sound, and the uncached ones still playing"""
+		for entry in list(self._sounds.values()) + self._uncached:
+			entry.sound.release()
+
+		self._sounds.clear()
+		self._uncached = []
+		self.bytes = 0
+
+	def stats(self):
+		lookups = self.hits + self.misses
+		return {
+			'entries': len(self._sounds),
+			'bytes': self.bytes,
+			'max_bytes': self.max_bytes,
+			'hits': self.hits,
+			'misses': self.misses,
+			'hit_rate': self.hits / lookups if lookups else 0,
+			'evictions': self.evictions
+		}
 
 class Driver(object):
 	def __init__(self, index, fmod_driver):
@@ -83,72 +554,379 @@ class Driver(object):
 			'channels': self.fmod_driver.speaker_mode_channels
 		}
 
+class DriverRegistry(object):
+	"""
+	Output drivers of an FMOD system, indexed by Driver.id
+
+	The list is built once on first use and rebuilt only after FMOD reports
+	that the device list changed, which it does from System.update on an
+	initialised system. An uninitialised system gets no such reports, pass
+	max_age to rebuild the list once it is older than that many seconds
+	instead.
+	"""
+
+	def __init__(self, fmod_system, max_age=None):
+		self.fmod_system = fmod_system
+		self.max_age = max_age
+		self._drivers = None
+		self._by_id = None
+		self._built = None
+
+		if max_age is None:
+			self.fmod_system.set_callback(self._device_list_changed, fmod.flags.SYSTEM_CALLBACK_TYPE.DEVICELISTCHANGED)
+
+	def _device_list_changed(self, system, type, data1, data2, userdata):
+		self.invalidate()
+		return 0
+
+	def invalidate(self):
+		self._drivers = None
+		self._by_id = None
+
+	def _build(self):
+		num_drivers = self.fmod_system.num_drivers
+		self._drivers = [Driver(i, self.fmod_system.get_driver_info(i)) for i in range(num_drivers)]
+		self._by_id = dict((driver.id, driver) for driver in self._drivers)
+		self._built = time.monotonic()
+
+	def _update(self):
+		if self._drivers is not None and self.max_age is not None and time.monotonic() - self._built > self.max_age:
+			self.invalidate()
+
+		if self._drivers is None:
+			self._build()
+
+	def drivers(self):
+		self._update()
+
+		return list(self._drivers)
+
+	def get(self, id):
+		"""Return the driver with the given id, as a UUID or string, or None"""
+		self._update()
+
+		if not isinstance(id, uuid.UUID):
+			try:
+				id = uuid.UUID(str(id))
+			except ValueError:
+				return None
+
+		return self._by_id.get(id)
+
+	def get_by_index(self, index):
+		self._update()
+
+		return self._drivers[index]
+
 class Speaker(object):
-	def __init__(self, index):
+	def __init__(self, router, index):
+		self.router = router
 		self.index = index
 
 		self.name = None
-		self.volume = 0
+		self._volume = 0
+
+	@property
+	def volume(self):
+		return self._volume
+
+	@volume.setter
+	def volume(self, volume):
+		if volume != self._volume:
+			self._volume = volume
+			self.router._invalidate_speaker(self)
 
 class SpeakerGroup(object):
+	"""
+	Set of speakers that zones and mixes are built from
+
+	Membership changes go through the speakers setter, add_speaker and
+	remove_speaker, which bump version and invalidate the zones built on this
+	group.
+	"""
+
 	def __init__(self, router, speakers):
 		self.router = router
-		self.speakers = speakers
-		self.mix_recipes = {}
+		self._speakers = tuple(speakers)
+		self.mix_recipes = MixRecipeCache()
+
+		self.version = 0
+		self._gains = None
+		self._zones = weakref.WeakSet()
+
+	@property
+	def speakers(self):
+		return self._speakers
+
+	@speakers.setter
+	def speakers(self, speakers):
+		speakers = tuple(speakers)
+		if speakers != self._speakers:
+			self._speakers = speakers
+			self._invalidate()
+
+	def add_speaker(self, speaker):
+		if speaker in self._speakers:
+			raise Exception("Speaker {} already in group".format(speaker.index))
+
+		self.speakers = self._speakers + (speaker,)
+
+	def remove_speaker(self, speaker):
+		if speaker not in self._speakers:
+			raise Exception("Speaker {} not in group".format(speaker.index))
+
+		self.speakers = [s for s in self._speakers if s is not speaker]
 
-	def play(file):
-		sound = self.router.fmod_system.create_sound(file)
-		format = sound.format
-		channels = format.channels
+	def get_speakers(self):
+		return self.speakers
 
+	@property
+	def gains(self):
+		"""Per speaker gain vector of this group, 1 for member speakers"""
+		if self._gains is None:
+			gains = numpy.zeros(self.router.num_speakers, dtype=numpy.float32)
+			gains[[speaker.index for speaker in self.speakers]] = 1
+			self._gains = gains
+
+		return self._gains
+
+	def _invalidate(self):
+		self.version += 1
+		self._gains = None
+
+		for zone in self._zones:
+			zone._invalidate()
+
+	def get_mix(self, channels, zones=()):
+		"""
+		Return the mix matrix routing a source with the given channel count to
+		this group, or to the given zones when provided
+
+		Matrices come from mix_recipes and are shared, do not modify them. They
+		are keyed by the versions they were built from, so membership and zone
+		changes lead to a new recipe.
+		"""
+		zones = sorted(set(zones), key=id)
+		if zones:
+			key = (channels, tuple((zone, zone.version) for zone in zones))
+		else:
+			key = (channels, self.version)
+
+		def build():
+			if zones:
+				gains = numpy.maximum.reduce([zone.gains for zone in zones])
+			else:
+				gains = self.gains
+
+			matrix = Matrix(channels, self.router.num_speakers)
+			matrix.matrix[...] = gains[:, None]
+			return matrix
+
+		return self.mix_recipes.get(key, build)
+
+	def play(self, file):
 		channel_group = self.router.fmod_system.create_channel_group("test")
-		sound.add_group(channel_group)
-		self.router.output.add_group(channel_group)
+		self.router.output.add_group(channel_group, True)
+
+		# Start paused, the mix depends on the channel count of the sound
+		channel = self.router.sounds.play(file, channel_group, paused=True)
 
-		matrix = Matrix(channels, router.num_speakers, 1)
-		channel_group.set_mix_matrix(matrix.flatten())
+		matrix = self.get_mix(channel.current_sound.format.channels)
+		channel_group.set_mix_matrix(matrix, matrix.outputs, matrix.inputs)
 
-		sound.play()
+		channel.paused = False
+		return channel
 
 class Zone(object):
+	"""
+	Node in a zone tree
+
+	Each zone caches the effective gain of every speaker it reaches, taking
+	its own group, its children and its gain into account. Changes invalidate
+	the zone and its ancestors only and bump their version, so channels can
+	tell whether the gains they last used are still current.
+	"""
+
 	def __init__(self, group, name):
 		self.group = group
 		self.name = name
+		self.parent = None
 		self.children = []
 
+		self.version = 0
+		self._gain = 1
+		self._gains = None
+
+		self.group._zones.add(self)
+
+	@property
+	def gain(self):
+		return self._gain
+
+	@gain.setter
+	def gain(self, gain):
+		if gain != self._gain:
+			self._gain = gain
+			self._invalidate()
+
+	@property
+	def gains(self):
+		"""Effective per speaker gain vector of this zone and its children"""
+		if self._gains is None:
+			gains = self.group.gains.copy()
+			for child in self.children:
+				numpy.maximum(gains, child.gains, out=gains)
+			gains *= self._gain
+
+			self._gains = gains
+
+		return self._gains
+
+	def _invalidate(self):
+		zone = self
+		while zone is not None:
+			zone.version += 1
+			zone._gains = None
+			zone = zone.parent
+
 	def add_zone(self, zone):
 		if zone in self.children:
-			raise Exception("Zone already has child " + zone)
+			raise Exception("Zone already has child " + zone.name)
+
+		if zone.parent is not None:
+			raise Exception("Zone " + zone.name + " already has a parent")
+
+		ancestor = self
+		while ancestor is not None:
+			if ancestor is zone:
+				raise Exception("Zone " + zone.name + " cannot be its own descendant")
+			ancestor = ancestor.parent
 
 		self.children.append(zone)
+		zone.parent = self
+		self._invalidate()
 
 	def remove_zone(self, zone):
 		if zone not in self.children:
-			raise Exception("Zone does not have child " + zone)
+			raise Exception("Zone does not have child " + zone.name)
 
 		self.children.remove(zone)
+		zone.parent = None
+		self._invalidate()
+
+	def get_speakers(self):
+		"""Return the set of speakers reached by this zone and its children"""
+		speakers = self.group.router.speakers.speakers
+		return set(speakers[i] for i in numpy.flatnonzero(self.gains))
 
 class ChannelZone(object):
 	def __init__(self, channel, zone):
 		self.channel = channel
 		self.zone = zone
-		self.volume = 1
+		self._volume = 1
+
+		self._version = None
+		self._gains = None
+
+	@property
+	def volume(self):
+		return self._volume
+
+	@volume.setter
+	def volume(self, volume):
+		if volume != self._volume:
+			self._volume = volume
+			self.channel._invalidate_gains(self.zone.gains)
 
 class Channel(object):
 	def __init__(self, router):
-		self.id = uuid.uuidv4()
+		self.id = uuid.uuid4()
 		self.router = router
-		self.output = self.router.fmod_system.create_channel_group()
+		self.output = self.router.fmod_system.create_channel_group(str(self.id))
 		self.zones = []
 
+		self.mix = SparseMatrix(router.num_speakers, router.num_speakers)
+		# What was last handed to FMOD, only changed rows are rewritten
+		self._mix_dense = Matrix(router.num_speakers, router.num_speakers)
+		self._dirty = numpy.zeros(router.num_speakers, dtype=bool)
+		self._mix_pushed = False
+		self._pan_gains = None
+		self._fade = (0, 0, 1, 1)
+
+		self.router.channels.append(self)
+
+	def _invalidate_gains(self, gains):
+		self._dirty |= gains != 0
+
+	def set_pan_gains(self, gains):
+		"""
+		Set the per speaker panning gains applied on top of the zone gains, None
+		to disable panning
+		"""
+		if gains is not None:
+			gains = numpy.asarray(gains, dtype=numpy.float32)
+
+		if gains is None or self._pan_gains is None:
+			self._dirty[:] = True
+		else:
+			self._dirty |= gains.view(numpy.uint32) != self._pan_gains.view(numpy.uint32)
+
+		self._pan_gains = gains
+
 	def _update_mix(self):
-		"""Recompute output mix matrix based on currently attached zones"""
+		"""
+		Recompute output mix matrix based on currently attached zones
 
-		mix = [0 for i in range(self.router.num_speakers * self.router.num_speakers)]
+		Only the speaker rows reached by zones invalidated since the last update
+		are recomputed and compared with what was pushed for them, and FMOD is
+		left alone if they come out unchanged. When the channel is panned, the
+		panning gains scale the zone gains.
+		"""
+		for cz in self.zones:
+			if cz._version != cz.zone.version:
+				if cz._gains is not None:
+					self._invalidate_gains(cz._gains)
+				self._invalidate_gains(cz.zone.gains)
 
+		if not self._dirty.any() and self._mix_pushed:
+			return
 
+		indices = numpy.flatnonzero(self._dirty)
+		self._dirty[:] = False
 
-		self.output.set_mix_matrix(mix, self.router.num_speakers, self.router.num_speakers)
+		gains = numpy.zeros(len(indices), dtype=numpy.float32)
+		for cz in self.zones:
+			numpy.maximum(gains, cz.zone.gains[indices] * numpy.float32(cz.volume), out=gains)
+			cz._version = cz.zone.version
+			cz._gains = cz.zone.gains
+
+		if self._pan_gains is not None:
+			gains *= self._pan_gains[indices]
+
+		rows = numpy.repeat(gains[:, None], self.mix.inputs, axis=1)
+
+		if self._mix_pushed:
+			pushed = self._mix_dense.matrix[indices]
+			changed = (rows.view(numpy.uint32) != pushed.view(numpy.uint32)).any(axis=1)
+			if not changed.any():
+				return
+
+			indices = indices[changed]
+			rows = rows[changed]
+
+		self.mix.set_output_vectors(indices, rows)
+		self._mix_dense.matrix[indices] = rows
+		self._push_mix()
+
+	def _push_mix(self):
+		self.router.control(self.output).set_mix_matrix(self._mix_dense, self.mix.outputs, self.mix.inputs)
+		self._mix_pushed = True
+		self.router.on_abort(self._mix_dropped)
+
+	def _mix_dropped(self):
+		# The push was dropped with its batch, recompute and push everything next time
+		self._dirty[:] = True
+		self._mix_pushed = False
 
 	def attach_zone(self, zone):
 		for cz in self.zones:
@@ -162,70 +940,328 @@ class Channel(object):
 
 	def detach_zone(self, cz):
 		self.zones.remove(cz)
+		if cz._gains is not None:
+			self._invalidate_gains(cz._gains)
 
-	def play(file):
-		sound = self.system.create_sound(file)
-		sound.channel_group = self.output
+	def _fade_level(self, clock):
+		start, end, start_level, end_level = self._fade
+		if clock >= end:
+			return end_level
+		if clock <= start:
+			return start_level
 
-		#speakers = group.get_speakers()
+		return start_level + (end_level - start_level) * (clock - start) / (end - start)
+
+	def ramp_volume(self, volume, duration):
+		"""
+		Fade the channel to volume over duration seconds
+
+		The ramp is scheduled as fade points on the DSP clock, so the mixer
+		interpolates it sample accurately without further calls. A ramp still
+		in progress is replaced, starting from the level it has reached. The
+		volume is set straight away when duration is 0 or the router has not
+		started, as there is no clock to schedule on yet. Inside a batch the
+		ramp is applied with the other changes when it commits.
+		"""
+		samples = 0
+		if self.router.sample_rate is not None:
+			samples = int(duration * self.router.sample_rate)
+
+		previous = self._fade
+		if samples <= 0:
+			self.router.set_fade(self.output, 0, volume, ())
+			self._fade = (0, 0, volume, volume)
+		else:
+			clock = self.output.dsp_clock.parent_clock
+			level = self._fade_level(clock)
+
+			# The fade points carry the level, volume would multiply with them
+			self.router.set_fade(self.output, clock, 1, ((clock, level), (clock + samples, volume)))
+			self._fade = (clock, clock + samples, level, volume)
+
+		def dropped():
+			self._fade = previous
+		self.router.on_abort(dropped)
+
+	def ramp_mix_gain(self, matrix, duration):
+		"""
+		Switch to the routing of the given mix matrix and ramp its gain over
+		duration seconds
+
+		This is not a crossfade between mixes, FMOD can only interpolate a
+		volume. The matrix is split into its peak gain, which is ramped with
+		ramp_volume, and its routing, normalised to that peak, which replaces
+		the current routing straight away. The level keeps applying on top of
+		later zone driven updates until the next ramp.
+		"""
+		if isinstance(matrix, Matrix):
+			matrix = matrix.matrix
+		matrix = numpy.asarray(matrix, dtype=numpy.float32).reshape(self.mix.outputs, self.mix.inputs)
+
+		level = float(numpy.abs(matrix).max())
+		if level:
+			self._mix_dense.matrix[...] = matrix / level
+			self.mix = SparseMatrix.from_dense(self._mix_dense)
+			self._push_mix()
+
+		self.ramp_volume(level, duration)
+
+	def play(self, file):
+		return self.router.sounds.play(file, self.output)
+
+def _set_fade(control, start, volume, points):
+	control.remove_fade_points(start, MAX_DSP_CLOCK)
+	control.volume = volume
+	for clock, level in points:
+		control.add_fade_point(clock, level)
+
+class Batch(object):
+	"""
+	Mix matrix, volume and mute changes queued for one DSP lock
+
+	Changes are coalesced per control, the last one queued wins. commit
+	applies them all between System.lock_dsp and unlock_dsp so the mixer never
+	renders a block with only some of them applied, and records how long the
+	lock was held in lock_time. abort drops them and runs the callbacks
+	registered with on_abort, so state that assumed the changes were applied
+	can be reset.
+	"""
+
+	def __init__(self, router):
+		self.router = router
+		self.changes = collections.OrderedDict()
+		self.aborts = []
+		self.lock_time = None
+
+	def __len__(self):
+		return len(self.changes)
+
+	def control(self, control):
+		"""Return a stand-in for control whose setters queue into this batch"""
+		return BatchedControl(self, control)
+
+	def set_mix_matrix(self, control, matrix, rows, cols, hop=0):
+		self.changes[(id(control), 'matrix')] = (control.set_mix_matrix, (matrix, rows, cols, hop))
+
+	def set_volume(self, control, volume):
+		self.changes[(id(control), 'volume')] = (lambda volume: setattr(control, 'volume', volume), (volume,))
+
+	def set_mute(self, control, mute):
+		self.changes[(id(control), 'mute')] = (lambda mute: setattr(control, 'mute', mute), (mute,))
+
+	def set_fade(self, control, start, volume, points):
+		self.changes[(id(control), 'fade')] = (_set_fade, (control, start, volume, points))
+
+	def on_abort(self, callback):
+		self.aborts.append(callback)
+
+	def abort(self):
+		self.changes.clear()
+
+		aborts, self.aborts = self.aborts, []
+		for callback in aborts:
+			callback()
+
+	def commit(self):
+		if not self.changes:
+			self.aborts = []
+			self.lock_time = 0
+			return
+
+		system = self.router.fmod_system
+
+		start = time.perf_counter()
+		system.lock_dsp()
+		try:
+			for apply, args in self.changes.values():
+				apply(*args)
+		finally:
+			system.unlock_dsp()
+			self.lock_time = time.perf_counter() - start
+
+		# Only now are the changes known to be applied, until here abort has to reset them
+		self.aborts = []
+		self.router.logger.debug('Applied {} mix changes, DSP locked for {:.3f}ms'.format(len(self.changes), self.lock_time * 1000))
+		self.changes.clear()
+
+class BatchedControl(object):
+	"""ChannelControl stand-in that queues into a Batch"""
+
+	def __init__(self, batch, control):
+		self.batch = batch
+		self.control = control
+
+	def set_mix_matrix(self, matrix, rows, cols, hop=0):
+		self.batch.set_mix_matrix(self.control, matrix, rows, cols, hop)
+
+	@property
+	def volume(self):
+		return self.control.volume
+
+	@volume.setter
+	def volume(self, volume):
+		self.batch.set_volume(self.control, volume)
+
+	@property
+	def mute(self):
+		return self.control.mute
+
+	@mute.setter
+	def mute(self, mute):
+		self.batch.set_mute(self.control, mute)
 
 class Router(object):
-	def __init__(self, num_speakers, logger=default_logger):
+	def __init__(self, num_speakers, logger=default_logger, fmod_system=None):
 		self.num_speakers = num_speakers
-		self.speakers = SpeakerGroup([Speaker(i) for i in range(num_speakers)])
+		self.speakers = SpeakerGroup(self, [Speaker(self, i) for i in range(num_speakers)])
+		self.channels = []
 		self.logger = logger
 
 		self.running = False
+		self.last_lock_time = None
+		self._batch = None
+		self.panner = None
+		self.sample_rate = None
 
-		self.fmod_system = fmod.System()
+		self.fmod_system = fmod.System() if fmod_system is None else fmod_system
 		self.output = None
 
+		self.volume_mix = SparseMatrix(num_speakers, num_speakers)
+		self._dirty_speakers = set(range(num_speakers))
+		self._volume_dense = None
+		self._volume_pushed = None
+
 		format = self.fmod_system.software_format
 		format.raw_speakers = num_speakers
 		format.speaker_mode = fmod.enums.SPEAKERMODE.RAW.value
 		self.fmod_system.software_format = format
 
-		#self.update_driver_cache()
+		self.drivers = DriverRegistry(self.fmod_system)
+		self.sounds = SoundCache(self.fmod_system)
+
+	def _invalidate_speaker(self, speaker):
+		self._dirty_speakers.add(speaker.index)
 
 	def _update_volume(self):
-		mix_matrix = [0 for i in range(self.num_speakers * self.num_speakers)]
+		"""Push the per speaker volumes of the dirty speakers to the output group"""
+		if not self._dirty_speakers and self._volume_pushed is not None:
+			return
 
-		for index, speaker in enumerate(self.speakers.speakers):
-			mix_matrix[index][index] = speaker.volume
+		for index in sorted(self._dirty_speakers):
+			self.volume_mix.set_output(index, index, self.speakers.speakers[index].volume)
+		self._dirty_speakers.clear()
 
-		self.output.set_mix_matrix(mix_matrix, self.num_speakers, self.num_speakers)
+		self._volume_dense = self.volume_mix.upload(self.control(self.output), self._volume_dense, self._volume_pushed)
+		self._volume_pushed = self.volume_mix.copy()
+		self.on_abort(self._volume_dropped)
 
-	def play(self, file, group):
-		sound = self.fmod_system.create_sound(file)
-		sound.channel_group = self.output
+	def _volume_dropped(self):
+		# Without a previous upload to diff against, the next one rewrites every output
+		self._volume_pushed = None
 
-		speakers = group.get_speakers()
+	@contextlib.contextmanager
+	def batch(self):
+		"""
+		Queue mix matrix, volume and mute changes and apply them atomically on exit
 
-		mix = [0 for i in range(self.num_speakers * self.num_speakers)]
+		Nested batches join the outermost one. Nothing is applied if the block
+		raises, and channels and speakers with dropped changes are pushed again
+		on the next update.
+		"""
+		if self._batch is not None:
+			yield self._batch
+			return
+
+		batch = Batch(self)
+		self._batch = batch
+		try:
+			yield batch
+			self._batch = None
+			batch.commit()
+		except BaseException:
+			batch.abort()
+			raise
+		finally:
+			self._batch = None
+
+		self.last_lock_time = batch.lock_time
+
+	def on_abort(self, callback):
+		"""Call callback if the current batch is dropped instead of committed"""
+		if self._batch is not None:
+			self._batch.on_abort(callback)
+
+	def pan(self, channels, positions):
+		"""
+		Pan channels to an (len(channels), 2) array of positions with the router
+		panner, computing the gains of all of them in one go
+		"""
+		if self.panner is None:
+			raise Exception("Router has no panner")
 
+		gains = self.panner.gains(positions)
+		if gains.shape != (len(channels), self.num_speakers):
+			raise Exception("Panner layout does not match speakers")
 
-	def get_all_drivers(self):
-		drivers = []
+		for channel, channel_gains in zip(channels, gains):
+			channel.set_pan_gains(channel_gains)
 
-		num_drivers = self.fmod_system.num_drivers
-		for i in range(num_drivers):
-			d = self.fmod_system.get_driver_info(i)
+	def control(self, control):
+		"""Return control, or a stand-in queueing into the current batch if there is one"""
+		if self._batch is None:
+			return control
+
+		return self._batch.control(control)
 
-			drivers.append(Driver(i, d))
+	def set_fade(self, control, start, volume, points):
+		"""
+		Replace the fade points of control from the start clock on with
+		(clock, level) points and set its volume, in the current batch if there
+		is one
+		"""
+		if self._batch is None:
+			_set_fade(control, start, volume, points)
+		else:
+			self._batch.set_fade(control, start, volume, points)
 
-		return drivers
+	def update(self):
+		"""Flush pending mix changes to FMOD and run its update"""
+		if not self.running:
+			raise Exception("Mixer is not running")
+
+		with self.batch():
+			for channel in self.channels:
+				channel._update_mix()
+
+			self._update_volume()
+
+		self.fmod_system.update()
+
+	def play(self, file, group):
+		"""Play file on the output, mixed to the speakers of group, and return the channel"""
+		channel = self.sounds.play(file, self.output, paused=True)
+
+		matrix = group.get_mix(channel.current_sound.format.channels)
+		channel.set_mix_matrix(matrix, matrix.outputs, matrix.inputs)
+
+		channel.paused = False
+		return channel
+
+	def update_driver_cache(self):
+		self.drivers.invalidate()
+
+	def get_all_drivers(self):
+		return self.drivers.drivers()
 
 	def get_driver_from_index(self, index):
-		return Driver(index, self.fmod_system.get_driver_info(index))
+		return self.drivers.get_by_index(index)
 
 	def get_index_from_driver(self, driver):
-		num_drivers = self.fmod_system.num_drivers
-		for i in range(num_drivers):
-			d = Driver(i, self.fmod_system.get_driver_info(i))
-			if d == driver:
-				return i
+		driver = self.drivers.get(driver.id)
+		if driver is None:
+			return None
 
-		return None
+		return driver.index
 
 	def get_driver(self):
 		"""
@@ -235,7 +1271,7 @@ class Router(object):
 		return self.get_driver_from_index(self.fmod_system.driver)
 
 	def set_driver(self, driver):
-		self.fmod_system.driver = driver.get_index()
+		self.fmod_system.driver = self.get_index_from_driver(driver)
 
 	def get_speaker(index):
 		return self.speakers.get_speaker(index)
@@ -245,6 +1281,7 @@ class Router(object):
 			raise Exception("Mixer already running")
 
 		self.fmod_system.init()
+		self.sample_rate = self.fmod_system.software_format.sample_rate
 
 		if self.output is None:
 			self.output = self.fmod_system.create_channel_group("main_mix")
@@ -256,6 +1293,7 @@ class Router(object):
 		if not self.running:
 			raise Exception("Mixer is not running")
 
+		self.sounds.clear()
 		self.fmod_system.close()
 
 		self.running = False
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import json
+import numpy
+import pyfmodex as fmod
+
+from pyfmodex.structobject import Structobject
+
+class Layout(object):
+	"""Speaker positions on the horizontal plane, one (x, y) row per speaker index"""
+
+	def __init__(self, positions):
+		self.positions = numpy.asarray(positions, dtype=numpy.float32).reshape(-1, 2)
+		self.active = numpy.ones(len(self.positions), dtype=bool)
+
+	def __len__(self):
+		return len(self.positions)
+
+	@classmethod
+	def from_file(cls, path):
+		"""
+		Load an ear layout file
+
+		The file is JSON of the form {"speakers": [{"index": 0, "x": 0, "y": 1}, ...]},
+		speakers left out or marked "active": false are not panned to.
+		"""
+		with open(path) as f:
+			speakers = json.load(f)['speakers']
+
+		num_speakers = max(speaker['index'] for speaker in speakers) + 1
+		layout = cls(numpy.zeros((num_speakers, 2)))
+		layout.active[:] = False
+
+		for speaker in speakers:
+			layout.positions[speaker['index']] = (speaker['x'], speaker['y'])
+			layout.active[speaker['index']] = speaker.get('active', True)
+
+		return layout
+
+	@classmethod
+	def from_system(cls, system, num_speakers):
+		"""Read speaker positions through System.get_speaker_position"""
+		if num_speakers > fmod.enums.SPEAKER.MAX.value:
+			raise Exception("FMOD only reports positions for {} speakers, use a layout file".format(fmod.enums.SPEAKER.MAX.value))
+
+		layout = cls(numpy.zeros((num_speakers, 2)))
+		for i in range(num_speakers):
+			position = system.get_speaker_position(fmod.enums.SPEAKER(i))
+			layout.positions[i] = (position.x, position.y)
+			layout.active[i] = position.active
+
+		return layout
+
+	def apply(self, system):
+		"""Write the speaker positions through System.set_speaker_position"""
+		for i, (x, y) in enumerate(self.positions.tolist()):
+			system.set_speaker_position(fmod.enums.SPEAKER(i), Structobject(x=x, y=y, active=bool(self.active[i])))
+
+class VBAPPanner(object):
+	"""
+	Pairwise vector base amplitude panning
+
+	Active speakers are sorted by azimuth and every adjacent pair's inverted
+	base is computed once, so panning M sources is a handful of array
+	operations over an (M, pairs) grid.
+	"""
+
+	def __init__(self, layout):
+		self.layout = layout
+
+		speakers = numpy.flatnonzero(layout.active)
+		if len(speakers) < 2:
+			raise Exception("VBAP needs at least two active speakers")
+
+		positions = layout.positions[speakers].astype(numpy.float64)
+		azimuths = numpy.arctan2(positions[:, 1], positions[:, 0])
+		order = numpy.argsort(azimuths)
+		speakers = speakers[order]
+
+		directions = positions[order] / numpy.linalg.norm(positions[order], axis=1)[:, None]
+
+		self.pairs = numpy.stack((speakers, numpy.roll(speakers, -1)), axis=1)
+		bases = numpy.stack((directions, numpy.roll(directions, -1, axis=0)), axis=1)
+
+		# Pairs spanning half a circle or more cannot be inverted, only keep usable ones
+		usable = numpy.abs(numpy.linalg.det(bases)) > 1e-6
+		if not usable.any():
+			raise Exception("VBAP needs speakers that are not all in line")
+
+		self.pairs = self.pairs[usable]
+		self.inverses = numpy.linalg.inv(bases[usable])
+
+	def gains(self, positions):
+		"""Return an (M, num_speakers) gain array for an (M, 2) array of source positions"""
+		positions = numpy.asarray(positions, dtype=numpy.float64).reshape(-1, 2)
+		norms = numpy.linalg.norm(positions, axis=1)
+		directions = positions / numpy.where(norms == 0, 1, norms)[:, None]
+
+		# (M, pairs, 2) gains of each source for each speaker pair
+		pair_gains = numpy.einsum('md,pdk->mpk', directions, self.inverses)
+		best = numpy.argmax(pair_gains.min(axis=2), axis=1)
+
+		rows = numpy.arange(len(positions))
+		chosen = numpy.clip(pair_gains[rows, best], 0, None)
+		chosen /= numpy.maximum(numpy.linalg.norm(chosen, axis=1), 1e-12)[:, None]
+
+		gains = numpy.zeros((len(positions), len(self.layout)), dtype=numpy.float32)
+		gains[rows[:, None], self.pairs[best]] = chosen
+
+		return gains
+
+class DBAPPanner(object):
+	"""
+	Distance based amplitude panning
+
+	Gains fall off with distance to each active speaker by rolloff dB per
+	doubling and are normalised to constant power. blur keeps sources placed
+	on a speaker from collapsing onto it entirely.
+	"""
+
+	def __init__(self, layout, rolloff=6, blur=0.1):
+		self.layout = layout
+		self.exponent = rolloff / (20 * numpy.log10(2))
+		self.blur = blur
+
+		self._positions = layout.positions.astype(numpy.float64)
+		self._active = layout.active
+
+	def gains(self, positions):
+		"""Return an (M, num_speakers) gain array for an (M, 2) array of source positions"""
+		positions = numpy.asarray(positions, dtype=numpy.float64).reshape(-1, 2)
+
+		offsets = positions[:, None, :] - self._positions[None, :, :]
+		distances = numpy.sqrt((offsets ** 2).sum(axis=2) + self.blur ** 2)
+
+		gains = numpy.where(self._active, distances ** -self.exponent, 0)
+		gains /= numpy.maximum(numpy.linalg.norm(gains, axis=1), 1e-12)[:, None]
+
+		return gains.astype(numpy.float32)
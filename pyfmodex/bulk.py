@@ -0,0 +1,151 @@
+"""Reading and writing the state of many channels at once.
+
+snapshot() fills a NumPy structured array with one row per channel and
+apply() writes columns of such an array back. Both loop over the channels
+calling the pre-bound FMOD functions directly, without going through the
+per-property wrappers. NumPy is only needed when these are used.
+"""
+from .globalvars import get_class
+from .scratch import scratch
+from .structures import VECTOR
+from .utils import ckresult
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHANNEL_STATE_FIELDS = [
+    ("volume", "f4"),
+    ("audibility", "f4"),
+    ("position", "f4", (3,)),
+    ("paused", "?"),
+    ("is_virtual", "?"),
+    ("is_playing", "?"),
+]
+
+# Columns apply() can write back
+WRITABLE_FIELDS = ("volume", "paused", "position")
+
+def _numpy():
+    if numpy is None:
+        raise ImportError("Bulk channel state needs numpy")
+    return numpy
+
+def channel_state_dtype():
+    """Returns the NumPy dtype of snapshot() rows."""
+    return _numpy().dtype(CHANNEL_STATE_FIELDS)
+
+def channel_state_array(size):
+    """Returns a zeroed array for snapshot() to fill.
+    :param size: The number of rows.
+    """
+    return _numpy().zeros(size, channel_state_dtype())
+
+def snapshot(channels, out=None):
+    """Reads the state of channels into a structured array, one row per channel.
+    Channels that are no longer valid (stopped or stolen) get a zeroed row.
+    :param channels: A sequence of Channel objects.
+    :param out: An array from channel_state_array() with at least len(channels) rows, a new one if None.
+    :returns: The filled rows of out.
+    """
+    n = len(channels)
+    if out is None:
+        out = channel_state_array(n)
+    elif out.dtype != channel_state_dtype() or len(out) < n:
+        raise ValueError("out must be a channel state array with at least %d rows" % n)
+    out = out[:n]
+
+    functions = get_class("Channel")._functions
+    is_playing = functions["IsPlaying"]
+    is_virtual = functions["IsVirtual"]
+    get_volume = functions["GetVolume"]
+    get_audibility = functions["GetAudibility"]
+    get_paused = functions["GetPaused"]
+    get_3d_attributes = functions["Get3DAttributes"]
+
+    s = scratch
+    playing_ref, virtual_ref, paused_ref = s.bool_ref
+    volume_ref, audibility_ref = s.float_ref[0], s.float_ref[1]
+    playing, virtual, paused = s.bool
+    volume, audibility = s.float[0], s.float[1]
+    pos = s.vector[0]
+    pos_ref = s.vector_ref[0]
+
+    # Invalid channels keep these zeroes, the others are written field by field without building rows
+    out[...] = 0
+    volumes = out["volume"]
+    audibilities = out["audibility"]
+    positions = out["position"]
+    paused_column = out["paused"]
+    virtual_column = out["is_virtual"]
+    playing_column = out["is_playing"]
+
+    for i, channel in enumerate(channels):
+        ptr = channel._ptr
+        if is_playing(ptr, playing_ref):
+            continue
+        ckresult(is_virtual(ptr, virtual_ref))
+        ckresult(get_volume(ptr, volume_ref))
+        ckresult(get_audibility(ptr, audibility_ref))
+        ckresult(get_paused(ptr, paused_ref))
+        ckresult(get_3d_attributes(ptr, pos_ref, None))
+        volumes[i] = volume.value
+        audibilities[i] = audibility.value
+        positions[i, 0] = pos.x
+        positions[i, 1] = pos.y
+        positions[i, 2] = pos.z
+        paused_column[i] = paused.value
+        virtual_column[i] = virtual.value
+        playing_column[i] = playing.value
+
+    return out
+
+def apply(channels, state, fields=WRITABLE_FIELDS):
+    """Writes columns of a channel state array back to the channels.
+    :param channels: A sequence of Channel objects, matching the rows of state.
+    :param state: A structured array with the columns named in fields.
+    :param fields: The columns to write, any of WRITABLE_FIELDS.
+    """
+    if len(state) < len(channels):
+        raise ValueError("Expected at least %d rows, got %d" % (len(channels), len(state)))
+    for field in fields:
+        if field not in WRITABLE_FIELDS:
+            raise ValueError("Cannot apply %s, writable fields are %s" % (field, ", ".join(WRITABLE_FIELDS)))
+
+    functions = get_class("Channel")._functions
+    if "volume" in fields:
+        set_volume = functions["SetVolume"]
+        for channel, value in zip(channels, state["volume"].tolist()):
+            ckresult(set_volume(channel._ptr, value))
+    if "paused" in fields:
+        set_paused = functions["SetPaused"]
+        for channel, value in zip(channels, state["paused"].tolist()):
+            ckresult(set_paused(channel._ptr, value))
+    if "position" in fields:
+        set_3d_attributes(channels, state["position"][:len(channels)])
+
+def _vectors(values, n):
+    """Returns values as n VECTORs sharing memory with a C contiguous float32 copy (or values itself, if it is one)."""
+    array = _numpy().ascontiguousarray(values, dtype="f4")
+    if array.shape != (n, 3):
+        raise ValueError("Expected an array of shape (%d, 3), got %s" % (n, array.shape))
+    vectors = (VECTOR * n).from_address(array.ctypes.data)
+    # Keep the memory alive for as long as the vectors are
+    vectors._array = array
+    return vectors
+
+def set_3d_attributes(channels, positions, velocities=None):
+    """Sets the 3D position and velocity of many channels in one pass.
+    The arrays are reinterpreted as VECTOR memory instead of being converted element by element.
+    :param channels: A sequence of N Channel or ChannelGroup objects.
+    :param positions: An (N, 3) array of positions, or None to leave positions unchanged.
+    :param velocities: An (N, 3) array of velocities, or None to leave velocities unchanged.
+    """
+    n = len(channels)
+    positions = _vectors(positions, n) if positions is not None else [None] * n
+    velocities = _vectors(velocities, n) if velocities is not None else [None] * n
+
+    for channel, pos, vel in zip(channels, positions, velocities):
+        ckresult(channel._functions["Set3DAttributes"](channel._ptr, pos, vel))
+        channel.invalidate_state_cache()
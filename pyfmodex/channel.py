@@ -5,11 +5,14 @@ from .globalvars import get_class
 from .callback_prototypes import CHANNELCONTROL_CALLBACK
 from .utils import ckresult, check_type
 from .structobject import Structobject as so
+from .scratch import scratch
 from .flags import MODE
 
 from .channel_control import ChannelControl
 
 class Channel(ChannelControl):
+    __slots__ = ()
+
 
     @property
     def pan_level(self):
@@ -39,12 +42,12 @@ class Channel(ChannelControl):
     
     @property
     def frequency(self):
-        freq = c_float()
-        ckresult(_dll.FMOD_Channel_GetFrequency(self._ptr, byref(freq)))
-        return freq.value
+        s = scratch
+        self._call_fmod("FMOD_Channel_GetFrequency", s.float_ref[0])
+        return s.float[0].value
     @frequency.setter
     def frequency(self, freq):
-        ckresult(_dll.FMOD_Channel_SetFrequency(self._ptr, c_float(freq)))
+        self._call_fmod("FMOD_Channel_SetFrequency", c_float(freq))
 
     @property
     def index(self):
@@ -72,9 +75,9 @@ class Channel(ChannelControl):
         ckresult(_dll.FMOD_Channel_SetLoopPoints(self._ptr, c_uint(start), int(startunit), c_uint(end), int(endunit)))
 
     def get_position(self, unit):
-        pos = c_uint()
-        ckresult(_dll.FMOD_Channel_GetPosition(self._ptr, byref(pos), int(unit)))
-        return pos.value
+        s = scratch
+        self._call_fmod("FMOD_Channel_GetPosition", s.uint_ref[0], int(unit))
+        return s.uint[0].value
 
     def set_position(self, pos, unit):
         ckresult(_dll.FMOD_Channel_SetPosition(self._ptr, pos, unit))
@@ -90,6 +93,6 @@ class Channel(ChannelControl):
 
     @property
     def is_virtual(self):
-        vi = c_bool()
-        ckresult(_dll.FMOD_Channel_IsVirtual(self._ptr, byref(vi)))
-        return vi.value
+        s = scratch
+        self._call_fmod("FMOD_Channel_IsVirtual", s.bool_ref[0])
+        return s.bool[0].value
@@ -1,17 +1,26 @@
 from ctypes import *
-from .fmodobject import FmodObject
+from .fmodobject import FmodObject, CachedState, shadowed
 from .cone_settings import ConeSettings
-from .utils import check_type
+from .utils import check_type, ckresult, float_array
+from .function_table import functions, PrefixedFunctions
+from .scratch import scratch
 from .globalvars import get_class
 from .structures import VECTOR
-from .structobject import Structobject as so
+from .structobject import Structobject as so, record
 from .flags  import MODE
 from .callback_prototypes import CHANNELCONTROL_CALLBACK
 
+DSPClock = record("DSPClock", ("dsp_clock", "parent_clock"))
+
+class ChannelControl(CachedState, FmodObject):
+    __slots__ = ("_cb", "_shadow")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._functions = PrefixedFunctions("FMOD_%s_" % cls.__name__, lambda: functions)
 
-class ChannelControl(FmodObject):
     def _call_specific(self, specific_function_suffix, *args):
-        return self._call_fmod("FMOD_%s_%s"%(self.__class__.__name__, specific_function_suffix), *args)
+        ckresult(self._functions[specific_function_suffix](self._ptr, *args))
     
     def add_dsp(self, index, dsp):
         check_type(dsp, get_class("DSP"))
@@ -22,31 +31,29 @@ class ChannelControl(FmodObject):
     def add_fade_point(self, dsp_clock, volume):
         self._call_specific("AddFadePoint", c_ulonglong(dsp_clock), c_float(volume))
     
-    @property
-    def _threed_attrs(self):
-        pos = VECTOR()
-        vel = VECTOR()
-        self._call_specific("Get3DAttributes", byref(pos), byref(vel))
-        return [pos.to_list(), vel.to_list()]
-    @_threed_attrs.setter
-    def _threed_attrs(self, attrs):
+    def _get_threed_attrs(self):
+        s = scratch
+        self._call_specific("Get3DAttributes", s.vector_ref[0], s.vector_ref[1])
+        return (tuple(s.vector[0].to_list()), tuple(s.vector[1].to_list()))
+    def _set_threed_attrs(self, attrs):
         pos = VECTOR.from_list(attrs[0])
         vel = VECTOR.from_list(attrs[1])
         self._call_specific("Set3DAttributes", byref(pos), byref(vel))
+    _threed_attrs = shadowed(_get_threed_attrs, _set_threed_attrs)
 
     @property
     def position(self):
-        return self._threed_attrs[0]
+        return list(self._threed_attrs[0])
     @position.setter
     def position(self, pos):
-        self._threed_attrs = (pos, self._threed_attrs[1])
+        self._threed_attrs = (tuple(pos), self._threed_attrs[1])
 
     @property
     def velocity(self):
-        return self._threed_attrs[1]
+        return list(self._threed_attrs[1])
     @velocity.setter
     def velocity(self, vel):
-        self._threed_attrs = (self._threed_attrs[0], vel)
+        self._threed_attrs = (self._threed_attrs[0], tuple(vel))
 
     @property
     def cone_orientation(self):
@@ -110,15 +117,13 @@ class ChannelControl(FmodObject):
     def level(self, level):
         self._call_specific("Set3DLevel", c_float(level))
         
-    @property
-    def _min_max_distance(self):
-        min = c_float()
-        max = c_float()
-        self._call_specific("Get3DMinMaxDistance", byref(min), byref(max))
-        return (min.value, max.value)
-    @_min_max_distance.setter
-    def _min_max_distance(self, dists):
+    def _get_min_max_distance(self):
+        s = scratch
+        self._call_specific("Get3DMinMaxDistance", s.float_ref[0], s.float_ref[1])
+        return (s.float[0].value, s.float[1].value)
+    def _set_min_max_distance(self, dists):
         self._call_specific("Set3DMinMaxDistance", c_float(dists[0]), c_float(dists[1]))
+    _min_max_distance = shadowed(_get_min_max_distance, _set_min_max_distance)
 
     @property
     def min_distance(self):
@@ -134,15 +139,13 @@ class ChannelControl(FmodObject):
     def max_distance(self, dist):
         self._min_max_distance = (self._min_max_distance[0], dist)
 
-    @property
-    def _occlusion(self):
-        direct = c_float()
-        reverb = c_float()
-        self._call_specific("Get3DOcclusion", byref(direct), byref(reverb))
-        return (direct.value, reverb.value)
-    @_occlusion.setter
-    def _occlusion(self, occs):
+    def _get_occlusion(self):
+        s = scratch
+        self._call_specific("Get3DOcclusion", s.float_ref[0], s.float_ref[1])
+        return (s.float[0].value, s.float[1].value)
+    def _set_occlusion(self, occs):
         self._call_specific("Set3DOcclusion", c_float(occs[0]), c_float(occs[1]))
+    _occlusion = shadowed(_get_occlusion, _set_occlusion)
 
     @property
     def direct_occlusion(self):
@@ -169,9 +172,9 @@ class ChannelControl(FmodObject):
 
     @property
     def audibility(self):
-        aud = c_float()
-        self._call_specific("GetAudibility", byref(aud))
-        return aud.value
+        s = scratch
+        self._call_specific("GetAudibility", s.float_ref[0])
+        return s.float[0].value
 
     def get_dsp(self, index):
         dsp = c_void_p()
@@ -180,10 +183,9 @@ class ChannelControl(FmodObject):
 
     @property
     def dsp_clock(self):
-        clock = c_ulonglong()
-        parent = c_ulonglong()
-        self._call_specific("GetDSPClock", byref(clock), byref(parent))
-        return so(dsp_clock=clock.value, parent_clock=parent.value)
+        s = scratch
+        self._call_specific("GetDSPClock", s.ulonglong_ref[0], s.ulonglong_ref[1])
+        return DSPClock(s.ulonglong[0].value, s.ulonglong[1].value)
 
     def get_dsp_index(self, dsp):
         index = c_int()
@@ -215,27 +217,38 @@ class ChannelControl(FmodObject):
     
     @property
     def low_pass_gain(self):
-        gain = c_float()
-        self._call_specific("GetLowPassGain", byref(gain))
-        return gain.value
+        s = scratch
+        self._call_specific("GetLowPassGain", s.float_ref[0])
+        return s.float[0].value
     @low_pass_gain.setter
     def low_pass_gain(self, gain):
         self._call_specific("SetLowPassGain", c_float(gain))
 
     def get_mix_matrix(self, hop=0):
+        """Returns the mix matrix.
+        :param hop: The row stride of the returned matrix, 0 for the number of input channels.
+        :returns: out_channels * hop gains, row (output) major.
+        """
         in_channels = c_int()
         out_channels = c_int()
-        self._call_fmod("FMOD_Channel_GetMixMatrix", None, byref(out_channels), byref(in_channels), hop)
-        matrix = (c_float * (hop or in_channels.value * out_channels.value))()
+        self._call_specific("GetMixMatrix", None, byref(out_channels), byref(in_channels), hop)
+        matrix = (c_float * (out_channels.value * (hop or in_channels.value)))()
         self._call_specific("GetMixMatrix", matrix, byref(out_channels), byref(in_channels), hop)
         return  list(matrix)
 
-    def set_mix_matrix(self, matrix, rows, cols):
-        if not matrix:
+    def set_mix_matrix(self, matrix, rows, cols, hop=0):
+        """Sets the mix matrix.
+        :param matrix: The rows * cols gains, row (output) major. Lists are copied, float32 buffers are passed through as is.
+        :param rows: The number of output channels.
+        :param cols: The number of input channels.
+        :param hop: The row stride of matrix, 0 when rows are packed. Allows passing the leading columns of a wider matrix without copying.
+        """
+        if matrix is None or not len(matrix):
             cols = 0
             rows = 0
-        raw_matrix = (c_float * (cols * rows))(*matrix)
-        self._call_specific("SetMixMatrix", raw_matrix, rows, cols, 0)
+            matrix = ()
+        raw_matrix = float_array(matrix, (hop or cols) * rows)
+        self._call_specific("SetMixMatrix", raw_matrix, rows, cols, hop)
 
     @property
     def mode(self):
@@ -248,9 +261,9 @@ class ChannelControl(FmodObject):
 
     @property
     def mute(self):
-        mute = c_bool()
-        self._call_specific("GetMute", byref(mute))
-        return mute.value
+        s = scratch
+        self._call_specific("GetMute", s.bool_ref[0])
+        return s.bool[0].value
     @mute.setter
     def mute(self, m):
         self._call_specific("SetMute", m)
@@ -263,18 +276,18 @@ class ChannelControl(FmodObject):
 
     @property
     def paused(self):
-        paused = c_bool()
-        self._call_specific("GetPaused", byref(paused))
-        return paused.value
+        s = scratch
+        self._call_specific("GetPaused", s.bool_ref[0])
+        return s.bool[0].value
     @paused.setter
     def paused(self, p):
         self._call_specific("SetPaused", p)
 
     @property
     def pitch(self):
-        val = c_float()
-        self._call_specific("GetPitch", byref(val))
-        return val.value
+        s = scratch
+        self._call_specific("GetPitch", s.float_ref[0])
+        return s.float[0].value
     @pitch.setter
     def pitch(self, val):
         self._call_specific("SetPitch", c_float(val))
@@ -295,28 +308,27 @@ class ChannelControl(FmodObject):
 
     @property
     def volume(self):
-        vol = c_float()
-        self._call_specific("GetVolume", byref(vol))
-        return vol.value
+        s = scratch
+        self._call_specific("GetVolume", s.float_ref[0])
+        return s.float[0].value
     @volume.setter
     def volume(self, vol):
         self._call_specific("SetVolume", c_float(vol))
 
     @property
     def volume_ramp(self):
-        ramp = c_bool()
-        self._call_specific("GetVolumeRamp", byref(ramp))
-        return ramp.value
+        s = scratch
+        self._call_specific("GetVolumeRamp", s.bool_ref[0])
+        return s.bool[0].value
     @volume_ramp.setter
     def volume_ramp(self,ramp):
         self._call_specific("SetVolumeRamp", ramp)
 
     @property
     def is_playing(self):
-        pl = c_bool()
-        self._call_specific("IsPlaying", byref(pl))
-        self._call_specific("IsPlaying", byref(pl))
-        return pl.value
+        s = scratch
+        self._call_specific("IsPlaying", s.bool_ref[0])
+        return s.bool[0].value
 
     def remove_dsp(self,  dsp):
         self._call_specific("RemoveDSP", dsp._ptr)
@@ -4,9 +4,12 @@ from .globalvars import dll as _dll
 from .globalvars import get_class
 from .channel_control import ChannelControl
 from .utils import check_type, ckresult
+from . import bulk
 
 
 class ChannelGroup(ChannelControl):
+    __slots__ = ()
+
 
     def add_group(self, group, propagate_dsp_clock):
         check_type(group, ChannelGroup)
@@ -19,6 +22,25 @@ class ChannelGroup(ChannelControl):
         self._call_fmod("FMOD_ChannelGroup_GetChannel", idx, byref(c_ptr))
         return get_class("Channel")(c_ptr)
 
+    def get_channels(self, recursive=False):
+        """Returns the channels playing in this group.
+        :param recursive: Whether to include the channels of all subgroups.
+        """
+        channels = [self.get_channel(i) for i in range(self.num_channels)]
+        if recursive:
+            for i in range(self.num_groups):
+                channels.extend(self.get_group(i).get_channels(True))
+        return channels
+
+    def snapshot(self, out=None, recursive=False):
+        """Reads the state of the channels in this group into a NumPy structured array, see bulk.snapshot.
+        :param out: A preallocated array from bulk.channel_state_array, a new one if None.
+        :param recursive: Whether to include the channels of all subgroups.
+        :returns: The channels and the array rows describing them, in the same order.
+        """
+        channels = self.get_channels(recursive)
+        return channels, bulk.snapshot(channels, out)
+
     def get_group(self, idx):
         grp_ptr = c_void_p()
         ckresult(_dll.FMOD_ChannelGroup_GetGroup(self._ptr, idx, byref(grp_ptr)))
@@ -50,4 +72,5 @@ class ChannelGroup(ChannelControl):
 
     def release(self):
         self._call_fmod("FMOD_ChannelGroup_Release")
+        self._forget()
 
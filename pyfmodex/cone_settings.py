@@ -1,5 +1,5 @@
 from ctypes import c_float, byref
-from .fmodobject import _dll
+from .function_table import functions
 from .structures import VECTOR, REVERB_PROPERTIES
 from .utils import ckresult
 
@@ -11,7 +11,7 @@ class ConeSettings(object):
         self._outvol = c_float()
         self._get_func = "FMOD_%s_Get3DConeSettings"%class_name
         self._set_func = "FMOD_%s_Set3DConeSettings"%class_name
-        ckresult(getattr(_dll, self._get_func)(self._sptr, byref(self._in), byref(self._out), byref(self._outvol)))
+        ckresult(functions[self._get_func](self._sptr, byref(self._in), byref(self._out), byref(self._outvol)))
 
     @property
     def inside_angle(self):
@@ -38,4 +38,4 @@ class ConeSettings(object):
         self._commit()
 
     def _commit(self):
-        ckresult(getattr(_dll, self._set_func)(self._sptr, self._in, self._out, self._outvol))
+        ckresult(functions[self._set_func](self._sptr, self._in, self._out, self._outvol))
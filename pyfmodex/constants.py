@@ -3,6 +3,7 @@ CODEC_WAVEFORMAT_VERSION = 3
 DSP_GETPARAM_VALUESTR_LENGTH = 32
 MAX_CHANNEL_WIDTH = 32
 MAX_LISTENERS = 8
+PLUGIN_SDK_VERSION = 110
 PORT_INDEX_NONE = -1
 REVERB_MAXINSTANCES = 4
 MAX_SYSTEMS = 8
\ No newline at end of file
@@ -6,8 +6,11 @@ from .flags import CHANNELMASK
 from .enums import SPEAKERMODE, DSP_TYPE
 from .structobject import Structobject as so
 from .structures import DSP_METERING_INFO, DSP_PARAMETER_DESC
+from .scratch import scratch, STRING_LENGTH
+
+class DSP(CachedState, FmodObject):
+    __slots__ = ("_shadow",)
 
-class DSP(FmodObject):
 
     def add_input(self, input, connection_type):
         check_type(input, DSP)
@@ -40,9 +43,9 @@ class DSP(FmodObject):
 
     @property
     def bypass(self):
-        bp = c_bool()
-        self._call_fmod("FMOD_DSP_GetBypass", byref(bp))
-        return bp.value
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetBypass", s.bool_ref[0])
+        return s.bool[0].value
     @bypass.setter
     def bypass(self, bp):
         self._call_fmod("FMOD_DSP_SetBypass", bp)
@@ -84,15 +87,13 @@ class DSP(FmodObject):
         self._call_fmod("FMOD_DSP_GetInput", index, byref(i_ptr), byref(ic_ptr))
         return (DSP(i_ptr), get_class("DSP_Connection")(ic_ptr))
 
-    @property
-    def _metering_enabled(self):
-        input = c_bool()
-        output = c_bool()
-        self._call_fmod("FMOD_DSP_GetMeteringEnabled", byref(input), byref(output))
-        return input.value, output.value
-    @_metering_enabled.setter
-    def _metering_enabled(self, values):
+    def _get_metering_enabled(self):
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetMeteringEnabled", s.bool_ref[0], s.bool_ref[1])
+        return s.bool[0].value, s.bool[1].value
+    def _set_metering_enabled(self, values):
         self._call_fmod("FMOD_DSP_SetMeteringEnabled", values[0], values[1])
+    _metering_enabled = shadowed(_get_metering_enabled, _set_metering_enabled)
         
     @property
     def input_metering_enabled(self):
@@ -150,10 +151,15 @@ class DSP(FmodObject):
         self._call_fmod("FMOD_DSP_GetOutputChannelFormat", byref(inmask), byref(inchannels), byref(inmode), byref(outmask), byref(outchannels), byref(outmode))
         return so(in_mask=CHANNELMASK(inmask.value), out_mask=CHANNELMASK(outmask.value), in_channels=inchannels.value, out_channels=outchannels.value, in_speaker_mode=SPEAKERMODE(inmode.value), out_speaker_mode=outmode.value) # The parameter should be an SPEAKERMODE, but the echo dsp returned basically random value there.
     def get_parameter_bool(self, index):
-        value_str = create_string_buffer(256)
-        value = c_bool()
-        self._call_fmod("FMOD_DSP_GetParameterBool", index, byref(value), value_str, len(value_str))
-        return value.value, value_str.value
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterBool", index, s.bool_ref[0], s.string, STRING_LENGTH)
+        return s.bool[0].value, s.string.value
+
+    def get_parameter_bool_value(self, index):
+        """Like get_parameter_bool, but only returns the value without having FMOD format it as a string."""
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterBool", index, s.bool_ref[0], None, 0)
+        return s.bool[0].value
         
     def get_parameter_data(self, index):
         value_str = create_string_buffer(256)
@@ -162,10 +168,15 @@ class DSP(FmodObject):
         self._call_fmod("FMOD_DSP_GetParameterData", index, byref(value), byref(value_len), value_str, len(value_str))
         return value, value_len.value, value_str.value
     def get_parameter_float(self, index):
-        value_str = create_string_buffer(256)
-        value = c_float()
-        self._call_fmod("FMOD_DSP_GetParameterFloat", index, byref(value), value_str, len(value_str))
-        return value.value, value_str.value
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterFloat", index, s.float_ref[0], s.string, STRING_LENGTH)
+        return s.float[0].value, s.string.value
+
+    def get_parameter_float_value(self, index):
+        """Like get_parameter_float, but only returns the value without having FMOD format it as a string."""
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterFloat", index, s.float_ref[0], None, 0)
+        return s.float[0].value
 
     def get_parameter_info(self, index):
         descs = (DSP_PARAMETER_DESC * 2)()
@@ -174,10 +185,15 @@ class DSP(FmodObject):
         return desc[0]
 
     def get_parameter_int(self, index):
-        value_str = create_string_buffer(256)
-        value = c_int()
-        self._call_fmod("FMOD_DSP_GetParameterInt", index, byref(value), value_str, len(value_str))
-        return value.value, value_str.value
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterInt", index, s.int_ref[0], s.string, STRING_LENGTH)
+        return s.int[0].value, s.string.value
+
+    def get_parameter_int_value(self, index):
+        """Like get_parameter_int, but only returns the value without having FMOD format it as a string."""
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetParameterInt", index, s.int_ref[0], None, 0)
+        return s.int[0].value
 
     def set_parameter_bool(self, index, val):
         self._call_fmod("FMOD_DSP_SetParameterBool", index, val)
@@ -202,16 +218,13 @@ class DSP(FmodObject):
         self._call_fmod("FMOD_DSP_GetType", byref(typ))
         return DSP_TYPE(typ.value)
 
-    @property
-    def _wet_dry_mix(self):
-        pre = c_float()
-        post = c_float()
-        dry = c_float()
-        self._call_fmod("FMOD_DSP_GetWetDryMix", byref(pre), byref(post), byref(dry))
-        return pre.value, post.value, dry.value
-    @_wet_dry_mix.setter
-    def _wet_dry_mix(self, values):
+    def _get_wet_dry_mix(self):
+        s = scratch
+        self._call_fmod("FMOD_DSP_GetWetDryMix", s.float_ref[0], s.float_ref[1], s.float_ref[2])
+        return s.float[0].value, s.float[1].value, s.float[2].value
+    def _set_wet_dry_mix(self, values):
         self._call_fmod("FMOD_DSP_SetWetDryMix", c_float(values[0]), c_float(values[1]), c_float(values[2]))
+    _wet_dry_mix = shadowed(_get_wet_dry_mix, _set_wet_dry_mix)
     @property
     def pre_mix(self):
         return self._wet_dry_mix[0]
@@ -239,6 +252,7 @@ class DSP(FmodObject):
 
     def release(self):
         self._call_fmod("FMOD_DSP_Release")
+        self._forget()
 
     def reset(self):
         self._call_fmod("FMOD_DSP_Reset")
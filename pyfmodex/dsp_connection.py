@@ -2,8 +2,11 @@ from ctypes import *
 from .fmodobject import *
 from .globalvars import get_class
 from .enums import DSPCONNECTION_TYPE
+from .utils import float_array
 
 class DSPConnection(FmodObject):
+    __slots__ = ()
+
 
     @property
     def input(self):
@@ -21,19 +24,30 @@ class DSPConnection(FmodObject):
         self._call_fmod("FMOD_DSPConnection_SetMix", c_float(m))
 
     def get_mix_matrix(self, hop=0):
+        """Returns the mix matrix.
+        :param hop: The row stride of the returned matrix, 0 for the number of input channels.
+        :returns: out_channels * hop gains, row (output) major.
+        """
         in_channels = c_int()
         out_channels = c_int()
         self._call_fmod("FMOD_DSPConnection_GetMixMatrix", None, byref(out_channels), byref(in_channels), hop)
-        matrix = (c_float * (hop or in_channels.value * out_channels.value))()
+        matrix = (c_float * (out_channels.value * (hop or in_channels.value)))()
         self._call_fmod("FMOD_DSPConnection_GetMixMatrix", matrix, byref(out_channels), byref(in_channels), hop)
         return  list(matrix)
 
-    def set_mix_matrix(self, matrix, rows, cols):
-        if not matrix:
+    def set_mix_matrix(self, matrix, rows, cols, hop=0):
+        """Sets the mix matrix.
+        :param matrix: The rows * cols gains, row (output) major. Lists are copied, float32 buffers are passed through as is.
+        :param rows: The number of output channels.
+        :param cols: The number of input channels.
+        :param hop: The row stride of matrix, 0 when rows are packed. Allows passing the leading columns of a wider matrix without copying.
+        """
+        if matrix is None or not len(matrix):
             cols = 0
             rows = 0
-        raw_matrix = (c_float * (cols * rows))(*matrix)
-        self._call_fmod("FMOD_DSPConnection_SetMixMatrix", raw_matrix, rows, cols, 0)
+            matrix = ()
+        raw_matrix = float_array(matrix, (hop or cols) * rows)
+        self._call_fmod("FMOD_DSPConnection_SetMixMatrix", raw_matrix, rows, cols, hop)
 
     @property
     def output(self):
@@ -1,10 +1,39 @@
+from weakref import WeakValueDictionary
 from .globalvars import dll as _dll
 from .enums import RESULT
 from .exceptions import FmodError
 from .utils import ckresult
+from .function_table import functions
 
-class FmodObject(object):
+def _pointer_value(ptr):
+    return getattr(ptr, "value", ptr)
+
+class FmodObjectType(type):
+    """Metaclass interning wrappers per class by pointer value.
+
+    Wrapping a pointer that already has a live wrapper returns that wrapper,
+    so identity checks hold and state kept on the wrapper is shared.
+    """
+    def __init__(cls, name, bases, namespace):
+        super(FmodObjectType, cls).__init__(name, bases, namespace)
+        cls._instances = WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        key = _pointer_value(args[0]) if args else None
+        if key:
+            obj = cls._instances.get(key)
+            if obj is not None:
+                return obj
+        obj = super(FmodObjectType, cls).__call__(*args, **kwargs)
+        key = _pointer_value(obj._ptr)
+        if key:
+            cls._instances[key] = obj
+        return obj
+
+class FmodObject(object, metaclass=FmodObjectType):
     """A base Fmod ex object."""
+    __slots__ = ("_ptr", "__weakref__")
+
     def __init__(self, ptr):
         """Constructor.
         :param ptr: The pointer representing this object.
@@ -12,11 +41,70 @@ class FmodObject(object):
         self._ptr = ptr
 
     def _call_fmod(self, funcname, *args):
-        result = getattr(_dll, funcname)(self._ptr, *args)
-        ckresult(result)
+        ckresult(functions[funcname](self._ptr, *args))
+
+    def _forget(self):
+        """Drops this wrapper from the interning cache, called once the native object is released."""
+        instances = type(self)._instances
+        key = _pointer_value(self._ptr)
+        if instances.get(key) is self:
+            del instances[key]
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
             return self._ptr.value == other._ptr.value
         else:
-            return False
\ No newline at end of file
+            return False
+
+    def __hash__(self):
+        return hash(_pointer_value(self._ptr))
+
+class CachedState(object):
+    """Mixin keeping the last known values of properties declared with shadowed().
+
+    Caching is off by default. Once enabled, reads of known values need no
+    native call and updating one field of a composite property costs a
+    single set call. Values changed outside this wrapper are not seen until
+    invalidate_state_cache() is called.
+    """
+    __slots__ = ()
+
+    def __init__(self, ptr):
+        super(CachedState, self).__init__(ptr)
+        self._shadow = None
+
+    @property
+    def state_cache(self):
+        """Whether property values are cached."""
+        return self._shadow is not None
+    @state_cache.setter
+    def state_cache(self, enabled):
+        self._shadow = {} if enabled else None
+
+    def invalidate_state_cache(self):
+        """Forgets cached values, the next reads go to FMOD."""
+        if self._shadow is not None:
+            self._shadow.clear()
+
+def shadowed(fget, fset):
+    """Returns a property over a native getter and setter whose values CachedState can cache.
+    Values are stored as tuples, so fget should return one.
+    :param fget: Reads the value from FMOD.
+    :param fset: Writes the value to FMOD.
+    """
+    key = fget.__name__
+    def get(self):
+        shadow = self._shadow
+        if shadow is None:
+            return fget(self)
+        try:
+            return shadow[key]
+        except KeyError:
+            value = shadow[key] = fget(self)
+            return value
+    def set(self, value):
+        value = tuple(value)
+        fset(self, value)
+        if self._shadow is not None:
+            self._shadow[key] = value
+    return property(get, set, doc=fget.__doc__)
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Pre-bound FMOD entry points.
+
+Every FMOD function is looked up in the library once and kept with its
+restype and, where declared below, its argtypes, so wrappers only pay for a
+dict lookup per call instead of string formatting and a library getattr.
+"""
+from ctypes import POINTER, c_bool, c_float, c_int, c_uint, c_ulonglong, c_void_p, c_char_p
+from .globalvars import dll as _dll
+from .structures import VECTOR, DSP_METERING_INFO
+
+# Argument types of the functions called from tight loops, after the object handle.
+# Outputs are typed as the wrappers declare them, FMOD_BOOL inputs are passed as int.
+_channel_control_signatures = {
+    "GetVolume": [POINTER(c_float)],
+    "SetVolume": [c_float],
+    "GetMute": [POINTER(c_bool)],
+    "SetMute": [c_int],
+    "GetPaused": [POINTER(c_bool)],
+    "SetPaused": [c_int],
+    "GetPitch": [POINTER(c_float)],
+    "SetPitch": [c_float],
+    "GetLowPassGain": [POINTER(c_float)],
+    "SetLowPassGain": [c_float],
+    "GetAudibility": [POINTER(c_float)],
+    "IsPlaying": [POINTER(c_bool)],
+    "Get3DAttributes": [POINTER(VECTOR), POINTER(VECTOR)],
+    "Set3DAttributes": [POINTER(VECTOR), POINTER(VECTOR)],
+    "GetDSPClock": [POINTER(c_ulonglong), POINTER(c_ulonglong)],
+    "AddFadePoint": [c_ulonglong, c_float],
+    "SetFadePointRamp": [c_ulonglong, c_float],
+    "RemoveFadePoints": [c_ulonglong, c_ulonglong],
+    "SetMixMatrix": [POINTER(c_float), c_int, c_int, c_int],
+}
+
+SIGNATURES = {
+    "FMOD_Channel_GetFrequency": [POINTER(c_float)],
+    "FMOD_Channel_SetFrequency": [c_float],
+    "FMOD_Channel_GetPosition": [POINTER(c_uint), c_int],
+    "FMOD_Channel_IsVirtual": [POINTER(c_bool)],
+    "FMOD_DSP_GetBypass": [POINTER(c_bool)],
+    "FMOD_DSP_SetBypass": [c_int],
+    "FMOD_DSP_GetParameterFloat": [c_int, POINTER(c_float), c_char_p, c_int],
+    "FMOD_DSP_SetParameterFloat": [c_int, c_float],
+    "FMOD_DSP_GetMeteringInfo": [POINTER(DSP_METERING_INFO), POINTER(DSP_METERING_INFO)],
+}
+for _class_name in ("Channel", "ChannelGroup"):
+    for _suffix, _argtypes in _channel_control_signatures.items():
+        SIGNATURES["FMOD_%s_%s" % (_class_name, _suffix)] = _argtypes
+
+class FunctionTable(dict):
+    """Maps FMOD function names to ctypes functions bound to a library.
+
+    Names in signatures are resolved up front, anything else the first time it
+    is asked for. Every function returns an FMOD_RESULT.
+    """
+    def __init__(self, library, signatures=None):
+        """Constructor.
+        :param library: The loaded library.
+        :param signatures: Function name to argtypes (without the handle).
+        """
+        super(FunctionTable, self).__init__()
+        self.library = library
+        self.signatures = signatures or {}
+        for name in self.signatures:
+            try:
+                self[name]
+            except AttributeError:
+                # Not exported by this library version, fail when it is called instead
+                pass
+
+    def __missing__(self, name):
+        # Index the library rather than getattr so argtypes don't leak into direct _dll calls
+        func = self.library[name]
+        func.restype = c_int
+        argtypes = self.signatures.get(name)
+        if argtypes is not None:
+            func.argtypes = [c_void_p] + argtypes
+        self[name] = func
+        return func
+
+class PrefixedFunctions(dict):
+    """Maps function suffixes to functions of one FMOD class, e.g. "GetVolume" to FMOD_Channel_GetVolume."""
+    def __init__(self, prefix, get_table):
+        """Constructor.
+        :param prefix: The function name prefix, e.g. "FMOD_Channel_".
+        :param get_table: Returns the FunctionTable to resolve from, called on first use.
+        """
+        super(PrefixedFunctions, self).__init__()
+        self.prefix = prefix
+        self.get_table = get_table
+
+    def __missing__(self, suffix):
+        func = self.get_table()[self.prefix + suffix]
+        self[suffix] = func
+        return func
+
+functions = FunctionTable(_dll, SIGNATURES)
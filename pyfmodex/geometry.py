@@ -56,6 +56,8 @@ class PolygonAttributes(object):
 
 
 class Geometry(FmodObject):
+    __slots__ = ()
+
 
     def add_polygon(self, directocclusion, reverbocclusion, doublesided, *vertices):
         va = VECTOR * len(vertices)
@@ -148,6 +150,7 @@ class Geometry(FmodObject):
 
     def release(self):
         self._call_fmod("FMOD_Geometry_Release")
+        self._forget()
 
     def save(self):
         size = c_int()
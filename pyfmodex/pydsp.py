@@ -0,0 +1,94 @@
+"""Custom DSPs written in Python.
+
+Subclass PyDSP, override process() on NumPy views of FMOD's buffers and
+add the DSP made by create() to the graph like any other.
+"""
+from ctypes import POINTER, c_float, c_int, c_uint, c_void_p, cast
+from .callback_prototypes import func, DSP_READ_CALLBACK, DSP_SHOULDIPROCESS_CALLBACK
+from .constants import PLUGIN_SDK_VERSION
+from .enums import RESULT
+from .structures import DSP_DESCRIPTION
+from .utils import prepare_str
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The read callback with plain addresses for the buffers, so no pointer objects are built per call
+_RAW_READ_CALLBACK = func(c_int, c_void_p, c_void_p, c_void_p, c_uint, c_int, POINTER(c_int))
+
+class PyDSP(object):
+    """Base class for DSPs processing audio in Python.
+
+    The description and the callbacks live on this object, keep it alive for
+    as long as the DSP it created exists.
+    """
+    name = "Python DSP"
+    version = 1
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError("PyDSP needs numpy")
+        self.dsp = None
+        # The last exception raised by process(), exceptions cannot propagate through FMOD
+        self.error = None
+        # (address, length, channels) to the NumPy view over that memory, FMOD reuses its buffers between calls
+        self._views = {}
+
+        self._read_callback = _RAW_READ_CALLBACK(self._read)
+        self._shouldiprocess_callback = DSP_SHOULDIPROCESS_CALLBACK(self._shouldiprocess)
+
+        self.description = DSP_DESCRIPTION()
+        self.description.pluginsdkversion = PLUGIN_SDK_VERSION
+        self.description.name = prepare_str(self.name)[:31]
+        self.description.version = self.version
+        self.description.numinputbuffers = 1
+        self.description.numoutputbuffers = 1
+        self.description.read = cast(self._read_callback, DSP_READ_CALLBACK)
+        self.description.shouldiprocess = self._shouldiprocess_callback
+
+    def create(self, system):
+        """Creates the DSP from this description.
+        :param system: The System to create it with.
+        :returns: The DSP, also kept in self.dsp.
+        """
+        self.dsp = system.create_dsp(self.description)
+        return self.dsp
+
+    def _view(self, address, length, channels):
+        key = (address, length, channels)
+        view = self._views.get(key)
+        if view is None:
+            view = numpy.frombuffer((c_float * (length * channels)).from_address(address), numpy.float32).reshape(length, channels)
+            self._views[key] = view
+        return view
+
+    def _read(self, state, inbuffer, outbuffer, length, inchannels, outchannels):
+        try:
+            self.process(self._view(inbuffer, length, inchannels), self._view(outbuffer, length, outchannels[0]))
+        except Exception as e:
+            self.error = e
+            return RESULT.INTERNAL.value
+        return RESULT.OK.value
+
+    def _shouldiprocess(self, state, inputs_idle, length, mask, channels, speaker_mode):
+        if self.should_process(inputs_idle, length, channels):
+            return RESULT.OK.value
+        return RESULT.DSP_DONTPROCESS.value
+
+    def should_process(self, inputs_idle, length, channels):
+        """Returns whether to run process() for this block, by default only when the inputs are not idle.
+        Skipped blocks never reach process() and leave the output silent.
+        """
+        return not inputs_idle
+
+    def process(self, inbuffer, outbuffer):
+        """Processes one block, called from the mixer thread. Passes the input through by default,
+        output channels the input does not have are left silent.
+        :param inbuffer: A (length, in channels) float32 view of the input.
+        :param outbuffer: A (length, out channels) float32 view to write the output to.
+        """
+        channels = min(inbuffer.shape[1], outbuffer.shape[1])
+        outbuffer[:, :channels] = inbuffer[:, :channels]
+        outbuffer[:, channels:] = 0
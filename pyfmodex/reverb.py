@@ -4,6 +4,8 @@ from .structures import VECTOR, REVERB_PROPERTIES
 from .utils import check_type
 
 class Reverb3D(FmodObject):
+    __slots__ = ()
+
 
     @property
     def _threed_attrs(self):
@@ -63,4 +65,5 @@ class Reverb3D(FmodObject):
         self._call_fmod("FMOD_Reverb3D_SetProperties", props)
 
     def release(self):
-        self._call_fmod("FMOD_Reverb3D_Release")
\ No newline at end of file
+        self._call_fmod("FMOD_Reverb3D_Release")
+        self._forget()
\ No newline at end of file
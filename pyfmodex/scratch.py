@@ -0,0 +1,31 @@
+"""Per-thread out-parameters for the wrappers.
+
+Getters pass these to FMOD instead of allocating new ctypes objects for
+every call. A wrapper has to read the values it needs before it makes
+another FMOD call, and must never hand a scratch object to the caller.
+"""
+import threading
+from ctypes import byref, c_bool, c_float, c_int, c_uint, c_ulonglong, create_string_buffer
+from .structures import VECTOR
+
+STRING_LENGTH = 256
+
+class Scratch(threading.local):
+    """Preallocated out-parameters and byref() references to them, separate for each thread."""
+    def __init__(self):
+        self.float = [c_float() for i in range(5)]
+        self.int = [c_int() for i in range(4)]
+        self.uint = [c_uint() for i in range(2)]
+        self.bool = [c_bool() for i in range(3)]
+        self.ulonglong = [c_ulonglong() for i in range(2)]
+        self.vector = [VECTOR() for i in range(2)]
+        self.string = create_string_buffer(STRING_LENGTH)
+
+        self.float_ref = [byref(v) for v in self.float]
+        self.int_ref = [byref(v) for v in self.int]
+        self.uint_ref = [byref(v) for v in self.uint]
+        self.bool_ref = [byref(v) for v in self.bool]
+        self.ulonglong_ref = [byref(v) for v in self.ulonglong]
+        self.vector_ref = [byref(v) for v in self.vector]
+
+scratch = Scratch()
@@ -1,13 +1,33 @@
+from contextlib import contextmanager
 from ctypes import *
 from .fmodobject import *
 from .fmodobject import _dll
 from .structures import TAG, VECTOR
 from .globalvars import get_class
 from .utils import prepare_str, ckresult, check_type
-from .structobject import Structobject as so
-from .enums import SOUND_TYPE, SOUND_FORMAT, OPENSTATE
+from .structobject import Structobject as so, record
+from .scratch import scratch
+from .function_table import functions
+from .enums import SOUND_TYPE, SOUND_FORMAT, OPENSTATE, RESULT
 from .flags import MODE, TIMEUNIT
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# NumPy sample type and bytes per sample of each PCM format, 24 bit samples are read as 3 bytes
+SAMPLE_TYPES = {
+    SOUND_FORMAT.PCM8: ("i1", 1),
+    SOUND_FORMAT.PCM16: ("<i2", 2),
+    SOUND_FORMAT.PCM24: ("u1", 3),
+    SOUND_FORMAT.PCM32: ("<i4", 4),
+    SOUND_FORMAT.PCMFLOAT: ("<f4", 4),
+}
+
+SoundFormat = record("SoundFormat", ("type", "format", "channels", "bits"))
+OpenState = record("OpenState", ("state", "percent_buffered", "starving", "disk_busy"))
+
 class ConeSettings(object):
     def __init__(self, sptr):
         self._sptr = sptr
@@ -44,6 +64,8 @@ class ConeSettings(object):
         ckresult(_dll.FMOD_Sound_Set3DConeSettings(self._sptr, self._in, self._out, self._outvol))
 
 class Sound(FmodObject):
+    __slots__ = ()
+
     def add_sync_point(self, offset, offset_type, name):
         name = prepare_str(name, "ascii")
         s_ptr = c_void_p()
@@ -131,17 +153,14 @@ class Sound(FmodObject):
 
     @property
     def format(self):
-        type = c_int()
-        format = c_int()
-        channels = c_int()
-        bits = c_int()
-        self._call_fmod("FMOD_Sound_GetFormat", byref(type), byref(format), byref(channels), byref(bits))
-        return so(type=SOUND_TYPE(type.value), format=SOUND_FORMAT(format.value), channels=channels.value, bits=bits.value)
+        s = scratch
+        self._call_fmod("FMOD_Sound_GetFormat", s.int_ref[0], s.int_ref[1], s.int_ref[2], s.int_ref[3])
+        return SoundFormat(SOUND_TYPE(s.int[0].value), SOUND_FORMAT(s.int[1].value), s.int[2].value, s.int[3].value)
         
     def get_length(self, ltype):
-        len = c_uint()
-        self._call_fmod("FMOD_Sound_GetLength", byref(len), int(ltype))
-        return len.value
+        s = scratch
+        self._call_fmod("FMOD_Sound_GetLength", s.uint_ref[0], int(ltype))
+        return s.uint[0].value
 
     @property
     def loop_count(self):
@@ -211,12 +230,9 @@ class Sound(FmodObject):
 
     @property
     def open_state(self):
-        state = c_int()
-        percentbuffered = c_uint()
-        starving = c_bool()
-        diskbusy = c_bool()
-        self._call_fmod("FMOD_Sound_GetOpenState", byref(state), byref(percentbuffered), byref(starving), byref(diskbusy))
-        return so(state=OPENSTATE(state.value), percent_buffered=percentbuffered.value, starving=starving.value, disk_busy=diskbusy.value)
+        s = scratch
+        self._call_fmod("FMOD_Sound_GetOpenState", s.int_ref[0], s.uint_ref[0], s.bool_ref[0], s.bool_ref[1])
+        return OpenState(OPENSTATE(s.int[0].value), s.uint[0].value, s.bool[0].value, s.bool[1].value)
 
     @property
     def sound_group(self):
@@ -273,8 +289,43 @@ class Sound(FmodObject):
         ckresult(_dll.FMOD_Sound_Lock(self._ptr, offset, length, byref(ptr1), byref(ptr2), byref(len1), byref(len2)))
         return ((ptr1, len1), (ptr2, len2))
 
+    @contextmanager
+    def locked(self, offset, length, as_array=False):
+        """Locks a region of sample memory for direct access and unlocks it on exit.
+        The region may wrap around the end of the sound, so it is returned in two parts;
+        the second one is empty unless it does.
+        :param offset: The offset into the sample memory in bytes.
+        :param length: The length of the region in bytes.
+        :param as_array: Yield NumPy arrays typed after Sound.format instead of byte memoryviews.
+        :returns: The writable parts, only valid inside the with block.
+        """
+        (ptr1, len1), (ptr2, len2) = self.lock(offset, length)
+        views = []
+        try:
+            for ptr, size in ((ptr1, len1.value), (ptr2, len2.value)):
+                if ptr.value and size:
+                    views.append(memoryview((c_char * size).from_address(ptr.value)).cast("B"))
+                else:
+                    views.append(memoryview(bytearray()))
+            if as_array:
+                if numpy is None:
+                    raise ImportError("Sound.locked needs numpy for as_array")
+                fmt = self.format
+                if fmt.format not in SAMPLE_TYPES:
+                    raise ValueError("Cannot view %s data as PCM frames" % fmt.format.name)
+                dtype, sample_size = SAMPLE_TYPES[fmt.format]
+                shape = (-1, fmt.channels, 3) if fmt.format is SOUND_FORMAT.PCM24 else (-1, fmt.channels)
+                yield tuple(numpy.frombuffer(view, dtype).reshape(shape) for view in views)
+            else:
+                yield tuple(views)
+        finally:
+            for view in views:
+                view.release()
+            self.unlock((ptr1, len1), (ptr2, len2))
+
     def release(self):
         self._call_fmod("FMOD_Sound_Release")
+        self._forget()
 
     def unlock(self, i1, i2):
         """I1 and I2 are tuples of form (ptr, len)."""
@@ -297,7 +348,89 @@ class Sound(FmodObject):
         buf = create_string_buffer(length)
         actual = c_uint()
         self._call_fmod("FMOD_Sound_ReadData", buf, length, byref(actual))
-        return buf.value, actual.value
+        return buf.raw[:actual.value], actual.value
+
+    def read_into(self, buffer):
+        """Reads decoded data directly into a writable buffer, without copying.
+        :param buffer: Anything writable and C contiguous supporting the buffer protocol, e.g. bytearray, memoryview or a NumPy array.
+        :returns: The number of bytes read, 0 once the end of the data is reached.
+        """
+        length = memoryview(buffer).nbytes
+        if not length:
+            return 0
+        target = (c_char * length).from_buffer(buffer)
+        s = scratch
+        result = functions["FMOD_Sound_ReadData"](self._ptr, target, length, s.uint_ref[0])
+        # Hitting the end still reads what was left
+        if result != RESULT.FILE_EOF.value:
+            ckresult(result)
+        return s.uint[0].value
+
+    def read_frames(self, frames, out=None):
+        """Reads decoded PCM frames as a NumPy array typed after the sound's format.
+        :param frames: The number of frames to read.
+        :param out: An array of shape (frames, channels) of the matching type to read into, a new one if None.
+        :returns: A (frames read, channels) view of out, (frames read, channels, 3) bytes for PCM24.
+        """
+        if numpy is None:
+            raise ImportError("Sound.read_frames needs numpy")
+        fmt = self.format
+        if fmt.format not in SAMPLE_TYPES:
+            raise ValueError("Cannot read %s data as PCM frames" % fmt.format.name)
+        dtype, sample_size = SAMPLE_TYPES[fmt.format]
+        shape = (frames, fmt.channels, 3) if fmt.format is SOUND_FORMAT.PCM24 else (frames, fmt.channels)
+        if out is None:
+            out = numpy.empty(shape, dtype)
+        elif out.shape[1:] != shape[1:] or out.dtype != numpy.dtype(dtype) or len(out) < frames:
+            raise ValueError("out must be a %s array of shape %s" % (dtype, shape))
+        read = self.read_into(out[:frames])
+        return out[:read // (sample_size * fmt.channels)]
+
+    def _to_frames(self, value, unit, fmt):
+        """Converts a position in unit to PCM frames."""
+        if unit == TIMEUNIT.PCM:
+            return int(value)
+        if unit == TIMEUNIT.MS:
+            return int(value * self.default_frequency / 1000)
+        if unit == TIMEUNIT.PCMBYTES:
+            return int(value) // (SAMPLE_TYPES[fmt.format][1] * fmt.channels)
+        raise ValueError("Cannot convert %s to PCM frames" % unit)
+
+    def iter_frames(self, frames, start=0, end=None, unit=TIMEUNIT.PCM, buffers=2):
+        """Walks the decoded data in blocks of a fixed number of frames, see read_frames.
+        The blocks are views of a ring of buffers reused as the walk goes on, copy a block
+        to keep it for longer than the next buffers - 1 iterations. The last block may be shorter.
+        :param frames: The number of frames per block.
+        :param start: Where to start, in unit.
+        :param end: Where to stop, in unit, None for the end of the data.
+        :param unit: TIMEUNIT.PCM, PCMBYTES or MS.
+        :param buffers: The number of buffers in the ring.
+        """
+        if numpy is None:
+            raise ImportError("Sound.iter_frames needs numpy")
+        fmt = self.format
+        if fmt.format not in SAMPLE_TYPES:
+            raise ValueError("Cannot read %s data as PCM frames" % fmt.format.name)
+        dtype = SAMPLE_TYPES[fmt.format][0]
+        shape = (frames, fmt.channels, 3) if fmt.format is SOUND_FORMAT.PCM24 else (frames, fmt.channels)
+        ring = [numpy.empty(shape, dtype) for i in range(buffers)]
+
+        position = self._to_frames(start, unit, fmt)
+        remaining = None if end is None else self._to_frames(end, unit, fmt) - position
+        self.seek_data(position)
+
+        i = 0
+        while remaining is None or remaining > 0:
+            count = frames if remaining is None else min(frames, remaining)
+            block = self.read_frames(count, ring[i])
+            if not len(block):
+                return
+            yield block
+            if remaining is not None:
+                remaining -= len(block)
+            if len(block) < count:
+                return
+            i = (i + 1) % buffers
 
     def seek_data(self, offset):
         """Seeks for data reading purposes.
@@ -4,6 +4,8 @@ from .fmodobject import *
 from .enums import SOUNDGROUP_BEHAVIOR
 
 class SoundGroup(FmodObject):
+    __slots__ = ()
+
 
     @property    
     def max_audible(self):
@@ -72,6 +74,7 @@ class SoundGroup(FmodObject):
 
     def release(self):
         self._call_fmod("FMOD_SoundGroup_Release")
+        self._forget()
 
     def stop(self):
         self._call_fmod("FMOD_SoundGroup_Stop")
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""Opening sounds from asyncio without blocking the event loop.
+
+Sounds are created with MODE.NONBLOCKING, FMOD opens them on its loading
+thread and reports back through the nonblock callback, which hands the
+result to the loop with call_soon_threadsafe. Sound.open_state is polled as
+well, in case the callback does not arrive.
+"""
+import asyncio
+import threading
+from .callback_prototypes import SOUND_NONBLOCKCALLBACK
+from .enums import OPENSTATE, RESULT
+from .exceptions import FmodError
+from .flags import MODE
+from .structures import CREATESOUNDEXINFO
+
+# Open states of a sound that has not finished opening
+_OPENING = (OPENSTATE.LOADING, OPENSTATE.CONNECTING)
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+def _release_loaded(task):
+    # The load was cancelled while FMOD kept opening, release what it opened
+    if not task.cancelled() and task.exception() is None:
+        task.result().release()
+
+class SoundLoader(object):
+    """Opens sounds on FMOD's loading thread, at most max_loads at a time.
+
+    One callback serves every load, keep this object alive while loads are
+    in progress. System.load_sound uses one made on first use.
+    """
+    def __init__(self, system, max_loads=4, poll_interval=0.1):
+        """Constructor.
+        :param system: The System to create the sounds with.
+        :param max_loads: How many sounds may be opening at the same time, further loads wait for a slot.
+        :param poll_interval: Seconds between open_state checks while waiting for the callback.
+        """
+        self.system = system
+        self.max_loads = max_loads
+        self.poll_interval = poll_interval
+        self.loading = 0
+        # Made on first use, so it belongs to the loop the loads run on
+        self._slots = None
+
+        self._callback = SOUND_NONBLOCKCALLBACK(self._loaded)
+        self._lock = threading.Lock()
+        # Sound pointer value to the (loop, future) waiting for it
+        self._pending = {}
+        # Results that arrived before create_sound returned, while _creating is non zero
+        self._early = {}
+        self._creating = 0
+
+    def _loaded(self, sound, result):
+        # Called on FMOD's loading thread, also for seeks and subsounds of sounds opened here
+        with self._lock:
+            pending = self._pending.pop(sound, None)
+            if pending is None and self._creating:
+                self._early[sound] = result
+        if pending is not None:
+            loop, future = pending
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result)
+            except RuntimeError:
+                # The loop was closed
+                pass
+        return RESULT.OK.value
+
+    def _poll(self, sound):
+        """Returns the result of opening sound, or None if it is still opening."""
+        try:
+            state = sound.open_state.state
+        except FmodError as e:
+            return e.result.value
+        if state == OPENSTATE.ERROR:
+            return RESULT.INTERNAL.value
+        if state in _OPENING:
+            return None
+        return RESULT.OK.value
+
+    async def load(self, name, mode=MODE.THREED, exinfo=None):
+        """Opens a sound without blocking the event loop.
+        Cancelling the returned coroutine leaves FMOD opening the sound, it is released once opened.
+        :param name: The file name or URL.
+        :param mode: MODE flags, NONBLOCKING is added.
+        :param exinfo: A CREATESOUNDEXINFO, copied before its nonblockcallback is set.
+        :returns: The opened Sound.
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_loads)
+        await self._slots.acquire()
+
+        try:
+            exinfo = CREATESOUNDEXINFO() if exinfo is None else CREATESOUNDEXINFO.from_buffer_copy(exinfo)
+            exinfo.nonblockcallback = self._callback
+            future = loop.create_future()
+
+            with self._lock:
+                self._creating += 1
+            sound = None
+            try:
+                sound = self.system.create_sound(name, mode | MODE.NONBLOCKING, exinfo)
+            finally:
+                with self._lock:
+                    self._creating -= 1
+                    if sound is not None:
+                        early = self._early.pop(sound._ptr.value, None)
+                        if early is None:
+                            self._pending[sound._ptr.value] = (loop, future)
+                    if not self._creating:
+                        self._early.clear()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        if early is not None:
+            _resolve(future, early)
+
+        self.loading += 1
+        waiter = loop.create_task(self._wait(sound, future))
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            waiter.add_done_callback(_release_loaded)
+            raise
+
+    async def _wait(self, sound, future):
+        try:
+            while True:
+                done, pending = await asyncio.wait([future], timeout=self.poll_interval)
+                if done:
+                    result = future.result()
+                    break
+                result = self._poll(sound)
+                if result is not None:
+                    break
+        finally:
+            with self._lock:
+                self._pending.pop(sound._ptr.value, None)
+            self.loading -= 1
+            self._slots.release()
+
+        if result != RESULT.OK.value:
+            sound.release()
+            raise FmodError(RESULT(result))
+        return sound
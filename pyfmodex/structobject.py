@@ -1,8 +1,12 @@
+import sys
+from operator import itemgetter
+
 #Implementation from http://benlast.livejournal.com/12301.html with removed unnecessary zope security flag
 class Structobject(object):
     def __init__(self, **kw):
         """Initialize, and set attributes from all keyword arguments."""
-        self.__members=[]
+        # Keys of an insertion ordered dict, for constant time membership checks
+        self.__members={}
         for k in list(kw.keys()):
             setattr(self,k,kw[k])
             self.__remember(k)
@@ -10,8 +14,7 @@ class Structobject(object):
 
     def __remember(self, k):
         """Add k to the list of explicitly set values."""
-        if not k in self.__members:
-            self.__members.append(k)
+        self.__members[k] = None
 
 
     def __getitem__(self, key):
@@ -32,7 +35,7 @@ class Structobject(object):
 
 
     def keys(self):
-        return self.__members
+        return list(self.__members)
 
 
     def iterkeys(self):
@@ -51,3 +54,66 @@ class Structobject(object):
             if s: s+=", "
             s += "%s: %s" % (x, repr(v))
         return s
+
+
+class Record(tuple):
+    """A read only, tuple backed Structobject for values returned from frequently called getters.
+    Subclasses are made with record() and take their values positionally or by keyword.
+    Iterating and unpacking give the values like any tuple, keys() and _asdict() the field names.
+    Unlike Structobject, which iterates its keys, so code that may get either should use keys().
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __new__(cls, *values, **kw):
+        if kw:
+            if values or set(kw) != set(cls._fields):
+                raise TypeError("%s takes the fields %s, got %s" % (cls.__name__, ", ".join(cls._fields), ", ".join(kw)))
+            values = tuple(kw[k] for k in cls._fields)
+        if len(values) != len(cls._fields):
+            raise TypeError("%s takes %d values, got %d" % (cls.__name__, len(cls._fields), len(values)))
+        return tuple.__new__(cls, values)
+
+    def __getitem__(self, key):
+        """Equivalent of dict access by key, integer indexes read the underlying tuple."""
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def has_key(self, key):
+        return key in self._fields
+
+    def keys(self):
+        return list(self._fields)
+
+    def iterkeys(self):
+        return iter(self._fields)
+
+    def _asdict(self):
+        """Returns the fields and their values as a dict."""
+        return dict(zip(self._fields, self))
+
+    def __str__(self):
+        return ", ".join("%s: %s" % (k, repr(v)) for k, v in zip(self._fields, self))
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, self)
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+
+def record(name, fields):
+    """Creates a Record subclass.
+    :param name: The class name.
+    :param fields: The field names, in order.
+    """
+    fields = tuple(fields)
+    # Like namedtuple, belong to the calling module so instances can be pickled
+    namespace = {"__slots__": (), "_fields": fields, "__module__": sys._getframe(1).f_globals.get("__name__")}
+    for i, field in enumerate(fields):
+        namespace[field] = property(itemgetter(i))
+    return type(name, (Record,), namespace)
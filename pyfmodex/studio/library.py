@@ -1,6 +1,7 @@
 import os
 import platform
 from ctypes import cdll, windll
+from ..function_table import FunctionTable
 
 arch = platform.architecture()[0]
 if os.name == 'nt':
@@ -21,4 +22,11 @@ def get_library():
     global library
     if not library:
         library = library_type.LoadLibrary(library_name)
-    return library
\ No newline at end of file
+    return library
+
+functions = None
+def get_functions():
+    global functions
+    if not functions:
+        functions = FunctionTable(get_library())
+    return functions
@@ -1,5 +1,6 @@
 from ..utils import ckresult
-from .library import get_library
+from .library import get_library, get_functions
+from ..function_table import PrefixedFunctions
 
 class StudioObject(object):
     """A base Fmod studio object."""
@@ -10,10 +11,12 @@ class StudioObject(object):
         self._ptr = ptr
         self._lib = get_library()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._functions = PrefixedFunctions(cls.function_prefix + "_", get_functions)
+
     def _call(self, specific_function_suffix, *args):
-        func_name = "%s_%s"%(self.function_prefix, specific_function_suffix)
-        result = getattr(self._lib, func_name)(self._ptr, *args)
-        ckresult(result)
+        ckresult(self._functions[specific_function_suffix](self._ptr, *args))
     
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -3,29 +3,58 @@ from ctypes import *
 from .utils import *
 from .structures import *
 from .globalvars import dll as _dll
-from .structobject import Structobject as so
+from .structobject import Structobject as so, record
 from .globalvars import get_class
 from .flags import INIT_FLAGS, MODE, TIMEUNIT
-from .enums import OUTPUTTYPE, PLUGINTYPE
+from .enums import OUTPUTTYPE, PLUGINTYPE, SOUND_FORMAT
 from .callback_prototypes import SYSTEM_CALLBACK, ROLLOFF_CALLBACK
 from .fmodobject import FmodObject
+from .scratch import scratch
+from .user_stream import UserStream
+from .sound_loader import SoundLoader
+
+CPUUsage = record("CPUUsage", ("dsp", "stream", "geometry", "update", "total"))
+DriverInfo = record("DriverInfo", ("name", "guid", "system_rate", "speaker_mode", "speaker_mode_channels"))
 
 class Listener(object):
-    """An 3d listener."""
+    """An 3d listener.
+    Keeps the last known attributes, System.listener returns the same object for an id.
+    """
     def __init__(self, sptr, id):
         """Constructor, should be considered non-public."""
+        self._sysptr = sptr
+        self._id = id
+        self.refresh()
+
+    def refresh(self):
+        """Reads the attributes from FMOD again, for when they were set other than through this object."""
         pos = VECTOR()
         vel = VECTOR()
         fwd = VECTOR()
         up = VECTOR()
-        self._sysptr = sptr
-        self._id = id
-        ckresult(_dll.FMOD_System_Get3DListenerAttributes(self._sysptr, id, byref(pos), byref(vel), byref(fwd), byref(up)))
+        ckresult(_dll.FMOD_System_Get3DListenerAttributes(self._sysptr, self._id, byref(pos), byref(vel), byref(fwd), byref(up)))
         self._pos = pos
         self._vel = vel
         self._fwd = fwd
         self._up = up
 
+    def update(self, position=None, velocity=None, forward=None, up=None):
+        """Sets any of the attributes and writes them all to FMOD in a single call.
+        :param position: [x, y, z] or None to keep the current position.
+        :param velocity: [x, y, z] or None to keep the current velocity.
+        :param forward: [x, y, z] or None to keep the current forward vector.
+        :param up: [x, y, z] or None to keep the current up vector.
+        """
+        if position is not None:
+            self._pos = VECTOR.from_list(position)
+        if velocity is not None:
+            self._vel = VECTOR.from_list(velocity)
+        if forward is not None:
+            self._fwd = VECTOR.from_list(forward)
+        if up is not None:
+            self._up = VECTOR.from_list(up)
+        self._commit()
+
     @property
     def position(self):
         """Returns the listener's position.
@@ -146,9 +175,13 @@ class ThreedSettings(object):
         self._rolloffscale = rscale
 
 class System(FmodObject):
+    __slots__ = ("_system_callbacks", "_listeners", "_user_open", "_user_close", "_user_read", "_user_seek", "_rolloff_callback", "_sound_loader")
+
     def __init__(self, ptr=None):
         """If ptr is None, new instance is created. Otherwise it must be a valid pointer of a System object."""
         self._system_callbacks = {}
+        self._listeners = {}
+        self._sound_loader = None
         if ptr is None:
             self._ptr = c_void_p()
             ckresult(_dll.FMOD_System_Create(byref(self._ptr)))
@@ -211,6 +244,23 @@ class System(FmodObject):
         ckresult(_dll.FMOD_System_CreateSound(self._ptr, name_or_addr, int(mode), exinfo, byref(snd_ptr)))
         return get_class("Sound")(snd_ptr)
 
+    @property
+    def sound_loader(self):
+        """The SoundLoader behind load_sound, made on first use. Assign one to change its limits."""
+        if self._sound_loader is None:
+            self._sound_loader = SoundLoader(self)
+        return self._sound_loader
+    @sound_loader.setter
+    def sound_loader(self, loader):
+        self._sound_loader = loader
+
+    def load_sound(self, name, mode=MODE.THREED, exinfo=None):
+        """Opens a sound on FMOD's loading thread, await the result from an asyncio event loop.
+        Takes the arguments of create_sound, see SoundLoader.load.
+        :returns: A coroutine returning the opened Sound.
+        """
+        return self.sound_loader.load(name, mode, exinfo)
+
     def create_sound_group(self, name):
         name = prepare_str(name)
         sg_ptr = c_void_p()
@@ -221,6 +271,30 @@ class System(FmodObject):
         mode = mode|MODE.CREATESTREAM
         return self.create_sound(name_or_addr, mode, exinfo)
     
+    def create_user_stream(self, channels, frequency, format=SOUND_FORMAT.PCMFLOAT, buffer_frames=None, decode_frames=0, mode=MODE.TWOD):
+        """Creates a looping stream playing PCM written to it from Python.
+        :param channels: The number of interleaved channels.
+        :param frequency: The sample rate.
+        :param format: The PCM SOUND_FORMAT of the written data.
+        :param buffer_frames: The capacity of the ring buffer in frames, half a second if None.
+        :param decode_frames: Frames FMOD asks for per read callback, 0 for FMOD's default.
+        :param mode: Extra MODE flags.
+        :returns: A UserStream, play its sound and feed it with write().
+        """
+        stream = UserStream(channels, frequency, format, buffer_frames or frequency // 2)
+        exinfo = CREATESOUNDEXINFO()
+        exinfo.numchannels = channels
+        exinfo.defaultfrequency = frequency
+        exinfo.format = format.value
+        exinfo.decodebuffersize = decode_frames
+        exinfo.length = frequency * stream.frame_size
+        exinfo.pcmreadcallback = stream._read_callback
+        exinfo.pcmsetposcallback = stream._setpos_callback
+        stream.sound = self.create_sound(None, mode | MODE.OPENUSER | MODE.CREATESTREAM | MODE.LOOP_NORMAL, exinfo)
+        # FMOD prefills the stream while creating it, before anything could be written
+        stream.ring.underruns = 0
+        return stream
+
     def close(self):
         ckresult(_dll.FMOD_System_Close(self._ptr))
 
@@ -237,13 +311,10 @@ class System(FmodObject):
         self._call_fmod("FMOD_System_Set3DNumListeners", num)
     @property
     def cpu_usage(self):
-        dsp = c_float()
-        stream = c_float()
-        geometry = c_float()
-        update = c_float()
-        total = c_float()
-        ckresult(_dll.FMOD_System_GetCPUUsage(self._ptr, byref(dsp), byref(stream), byref(geometry), byref(update), byref(total)))
-        return so(dsp=dsp.value, stream=stream.value, geometry=geometry.value, update=update.value, total=total.value)
+        s = scratch
+        f = s.float_ref
+        ckresult(_dll.FMOD_System_GetCPUUsage(self._ptr, f[0], f[1], f[2], f[3], f[4]))
+        return CPUUsage(*[v.value for v in s.float])
 
     def get_channel(self, id):
         c_ptr = c_void_p()
@@ -313,7 +384,7 @@ class System(FmodObject):
         speaker_mode = c_int()
         channels = c_int()
         ckresult(_dll.FMOD_System_GetDriverInfo(self._ptr, id, name, 256, byref(guid), byref(system_rate), byref(speaker_mode), byref(channels)))
-        return so(name=name.value, guid=guid, system_rate=system_rate.value, speaker_mode=speaker_mode.value, speaker_mode_channels=channels.value)
+        return DriverInfo(name.value, guid, system_rate.value, speaker_mode.value, channels.value)
 
     @property
     def file_usage(self):
@@ -348,6 +419,13 @@ class System(FmodObject):
         ckresult(_dll.FMOD_System_GetMasterChannelGroup(self._ptr, byref(grp_ptr)))
         return get_class("ChannelGroup")(grp_ptr)
 
+    def snapshot_channels(self, out=None):
+        """Reads the state of every playing channel into a NumPy structured array, see bulk.snapshot.
+        :param out: A preallocated array from bulk.channel_state_array, a new one if None.
+        :returns: The channels and the array rows describing them, in the same order.
+        """
+        return self.master_channel_group.snapshot(out, recursive=True)
+
     @property
     def master_sound_group(self):
         grp_ptr = c_void_p()
@@ -585,6 +663,7 @@ class System(FmodObject):
     
     def release(self):
         ckresult(_dll.FMOD_System_Release(self._ptr))
+        self._forget()
 
     def set_3d_rolloff_callback(self, callback):
         cb = ROLLOFF_CALLBACK(callback or 0)
@@ -618,5 +697,18 @@ class System(FmodObject):
         return ver.value
 
     def listener(self, id=0):
-        return Listener(self._ptr, id)
+        try:
+            return self._listeners[id]
+        except KeyError:
+            listener = self._listeners[id] = Listener(self._ptr, id)
+            return listener
+
+    def update_listeners(self, attributes):
+        """Sets the attributes of listeners 0 to len(attributes) - 1, one FMOD call per listener.
+        :param attributes: Per listener [position, velocity, forward, up], each [x, y, z], e.g. a NumPy array of shape (num_3d_listeners, 4, 3).
+        """
+        if hasattr(attributes, "tolist"):
+            attributes = attributes.tolist()
+        for id, (position, velocity, forward, up) in enumerate(attributes):
+            self.listener(id).update(position, velocity, forward, up)
 
@@ -0,0 +1,122 @@
+"""Streams fed from Python through FMOD's pcmreadcallback.
+
+Producers write PCM into a RingBuffer, FMOD's stream thread copies it out
+in the read callback. The callback only moves memory and updates counters.
+"""
+from ctypes import addressof, c_char, memmove, memset
+from .callback_prototypes import SOUND_PCMREADCALLBACK, SOUND_PCMSETPOSCALLBACK
+from .enums import SOUND_FORMAT
+from .sound import SAMPLE_TYPES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class RingBuffer(object):
+    """A single producer, single consumer byte ring buffer.
+
+    The producer only advances written and the consumer only advances read,
+    both count bytes since creation, so neither side needs a lock.
+    """
+    def __init__(self, size):
+        """Constructor.
+        :param size: The capacity in bytes.
+        """
+        self.size = size
+        self._buffer = (c_char * size)()
+        self._address = addressof(self._buffer)
+        self._view = memoryview(self._buffer).cast("B")
+        self.written = 0
+        self.read = 0
+        self.underruns = 0
+
+    @property
+    def available(self):
+        """Bytes written but not yet read."""
+        return self.written - self.read
+
+    @property
+    def free(self):
+        """Bytes that can be written without overwriting unread data."""
+        return self.size - (self.written - self.read)
+
+    def write(self, data, granularity=1):
+        """Copies as much of data as fits into the ring.
+        :param data: Any C contiguous buffer.
+        :param granularity: Only write multiples of this many bytes, e.g. the frame size.
+        :returns: The number of bytes written.
+        """
+        data = memoryview(data).cast("B")
+        n = min(len(data), self.free)
+        n -= n % granularity
+        start = self.written % self.size
+        first = min(n, self.size - start)
+        self._view[start:start + first] = data[:first]
+        if n > first:
+            self._view[:n - first] = data[first:n]
+        self.written += n
+        return n
+
+    def read_into(self, address, length):
+        """Copies length bytes to address, filling with silence and counting an underrun when short.
+        :param address: The destination address.
+        :param length: The number of bytes wanted.
+        """
+        n = min(length, self.written - self.read)
+        start = self.read % self.size
+        first = min(n, self.size - start)
+        memmove(address, self._address + start, first)
+        if n > first:
+            memmove(address + first, self._address, n - first)
+        if n < length:
+            memset(address + n, 0, length - n)
+            self.underruns += 1
+        self.read += n
+
+class UserStream(object):
+    """A user created FMOD stream playing what is written to it, made by System.create_user_stream."""
+    def __init__(self, channels, frequency, format, buffer_frames):
+        """Constructor, should be considered non-public."""
+        self.channels = channels
+        self.frequency = frequency
+        self.format = format
+        self.dtype, sample_size = SAMPLE_TYPES[format]
+        self.frame_size = sample_size * channels
+        self.ring = RingBuffer(buffer_frames * self.frame_size)
+        self.sound = None
+
+        # FMOD keeps only the function pointers, these references keep them callable
+        self._read_callback = SOUND_PCMREADCALLBACK(self._pcm_read)
+        self._setpos_callback = SOUND_PCMSETPOSCALLBACK(self._pcm_setpos)
+
+    def _pcm_read(self, sound, data, length):
+        self.ring.read_into(data, length)
+        return 0
+
+    def _pcm_setpos(self, sound, subsound, position, postype):
+        # Playback position is whatever has been written, seeking is not supported
+        return 0
+
+    @property
+    def underruns(self):
+        """How many times FMOD asked for more data than had been written, not counting the prefill when the stream was created."""
+        return self.ring.underruns
+
+    @property
+    def free_frames(self):
+        """Frames that can be written without dropping any."""
+        return self.ring.free // self.frame_size
+
+    def write(self, block):
+        """Queues PCM for playback, writing as many whole frames as fit.
+        :param block: Interleaved samples in the stream's format, e.g. a (frames, channels) NumPy array. Other NumPy types are converted.
+        :returns: The number of frames written.
+        """
+        if numpy is not None and isinstance(block, numpy.ndarray):
+            block = numpy.ascontiguousarray(block, self.dtype)
+        return self.ring.write(block, self.frame_size) // self.frame_size
+
+    def release(self):
+        """Releases the sound, the callbacks stay valid until this object is collected."""
+        self.sound.release()
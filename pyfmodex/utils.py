@@ -1,12 +1,37 @@
 import sys
+from collections import Counter
+from ctypes import Array, POINTER, c_float
 from .enums import RESULT
 from .exceptions import FmodError
 
 
+# Failed FMOD calls per (filename, line, function, RESULT), filled in while count_errors is enabled.
+error_counts = Counter()
+_counting_errors = False
+
+# Wrapper helpers that sit between a call site and ckresult.
+_call_helpers = {"_call_fmod", "_call_specific", "_call"}
+
+def count_errors(enabled=True):
+    """Enables or disables counting failed calls per call site in error_counts.
+    :param enabled: Whether to count errors.
+    """
+    global _counting_errors
+    _counting_errors = enabled
+
 def ckresult(result):
+    # FMOD_OK is 0, only build the enum when there is an error to report
+    if result:
+        _raise_result(result)
+
+def _raise_result(result):
     result = RESULT(result)
-    if result is not RESULT.OK:
-        raise FmodError(result)
+    if _counting_errors:
+        frame = sys._getframe(2)
+        while frame.f_back is not None and frame.f_code.co_name in _call_helpers:
+            frame = frame.f_back
+        error_counts[(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name, result)] += 1
+    raise FmodError(result)
 
 def check_type(obj, cls, msg="Bad type of passed argument (%s), expected %s"):
     if not isinstance(obj, cls): raise TypeError(msg%(str(type(obj)),str(cls)))
@@ -14,4 +39,21 @@ def check_type(obj, cls, msg="Bad type of passed argument (%s), expected %s"):
 def prepare_str(string, encoding=sys.getfilesystemencoding()):
     if hasattr(string, "encode"):
         return string.encode(encoding)
-    return string
\ No newline at end of file
+    return string
+
+def float_array(values, length):
+    """Returns values in a form that can be passed to FMOD as a float pointer.
+    ctypes arrays, objects providing _as_parameter_ and C contiguous float32
+    buffers (e.g. numpy arrays) are passed through without copying.
+    :param values: The float values.
+    :param length: The number of floats FMOD will read.
+    """
+    if isinstance(values, Array) or hasattr(values, "_as_parameter_"):
+        if len(values) < length:
+            raise ValueError("Expected at least %d values, got %d" % (length, len(values)))
+        return values
+    if getattr(values, "dtype", None) == "float32" and values.flags["C_CONTIGUOUS"]:
+        if values.size < length:
+            raise ValueError("Expected at least %d values, got %d" % (length, values.size))
+        return values.ctypes.data_as(POINTER(c_float))
+    return (c_float * length)(*values)
@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 
 import asyncio
+import json
+import pyfmodex as fmod
 import websockets
 
+from ear import DriverRegistry
+
 server = None
+drivers = None
 GLOBAL_DISPATCHER = {}
 SYSTEM_DISPATCHER = {}
 
+# Seconds a driver list is served before it is enumerated again
+DRIVER_LIST_MAX_AGE = 5
+
 def global_method(fn):
 	GLOBAL_DISPATCHER[fn.__name__] = fn
 	return fn
@@ -15,6 +23,33 @@ def system_method(fn):
 	SYSTEM_DISPATCHER[fn.__name__] = fn
 	return fn
 
+def get_drivers():
+	"""
+	Return the driver registry shared by all requests
+
+	It is backed by one FMOD system that is never initialised, drivers can be
+	enumerated without it, so the server does not open an output device of its
+	own. Such a system gets no device list change callbacks, so the list is
+	rebuilt once it is DRIVER_LIST_MAX_AGE seconds old, or when list_drivers
+	is asked to refresh it.
+	"""
+	global drivers
+
+	if drivers is None:
+		drivers = DriverRegistry(fmod.System(), max_age=DRIVER_LIST_MAX_AGE)
+
+	return drivers
+
+def get_driver(driver_id):
+	return get_drivers().get(driver_id)
+
+def release_drivers():
+	global drivers
+
+	if drivers is not None:
+		drivers.fmod_system.release()
+		drivers = None
+
 def error(message, data=None):
 	e = {"error": message}
 	if data is not None:
@@ -54,16 +89,11 @@ async def create_system(req, socket):
 
 @global_method
 async def list_drivers(req, socket):
-	s = fmod.System()
+	registry = get_drivers()
+	if req.get("refresh", False):
+		registry.invalidate()
 
-	drivers = []
-
-	num_drivers = s.num_drivers
-	for i in range(num_drivers):
-		d = s.get_driver_info(i)
-		driver = Driver(i, d)
-
-		drivers.append(driver.json_obj())
+	drivers = [driver.obj() for driver in registry.drivers()]
 
 	await socket.send(json.dumps(drivers))
 
@@ -71,6 +101,23 @@ async def list_drivers(req, socket):
 async def get_usage(system, req, socket):
 	await socket.send(json.dumps(system.usage()))
 
+@system_method
+async def load_sound(system, req, socket):
+	"""Open a sound into the system's cache without blocking other clients"""
+	path = req.get("file", None)
+	if not path:
+		await socket.send(error("Missing file"))
+		return
+
+	try:
+		await system.sounds.load(path)
+	except fmod.FmodError as e:
+		await socket.send(error(str(e), path))
+	else:
+		await socket.send(json.dumps({
+			"loaded": path
+		}))
+
 def main(argv):
 	parser = argparse.ArgumentParser(description='Process some integers.')
 	parser.add_argument('--sum', dest='accumulate', action='store_const',
@@ -117,6 +164,8 @@ def main(argv):
 		asyncio.get_event_loop().run_forever()
 	except KeyboardInterrupt as e:
 		pass
+	finally:
+		release_drivers()
 
 	return 0
 
@@ -1,11 +1,22 @@
+import asyncio
+import ctypes
+import types
 import unittest
 
 import ear
+import numpy
+import panning
+from pyfmodex.enums import OPENSTATE, RESULT
+from pyfmodex.exceptions import FmodError
+from pyfmodex.sound_loader import SoundLoader
+from pyfmodex.pydsp import PyDSP
+from pyfmodex.structobject import record
+from pyfmodex.user_stream import RingBuffer
 
 class TestMatrix(unittest.TestCase):
 	def test_matrix(self):
-		matrix = ear.Matrix(2, 3, None)
-		self.assertEqual([None, None, None, None, None, None], matrix.flatten())
+		matrix = ear.Matrix(2, 3, 0)
+		self.assertEqual([0, 0, 0, 0, 0, 0], matrix.flatten())
 
 		matrix.fill([
 			[1, 2, 3],
@@ -20,6 +31,737 @@ class TestMatrix(unittest.TestCase):
 		matrix.set_output_vector(0, [7, 8])
 		self.assertEqual([7, 2, 3, 8, 5, 6], matrix.flatten())
 
+	def test_matrix_views(self):
+		matrix = ear.Matrix(2, 3)
+
+		matrix.input_view(1)[:] = 0.5
+		matrix.output_view(2)[0] = 1
+		self.assertEqual([0, 0, 1, 0.5, 0.5, 0.5], matrix.flatten())
+
+		self.assertEqual((3, 2), matrix.matrix.shape)
+		self.assertTrue(matrix.matrix.flags['C_CONTIGUOUS'])
+		self.assertEqual(6, len(matrix))
+
+		with self.assertRaises(Exception):
+			matrix.set_output_vector(0, [1, 2, 3])
+
+		with self.assertRaises(Exception):
+			matrix.fill([[1, 2], [3, 4]])
+
+class TestSparseMatrix(unittest.TestCase):
+	def test_sparse_matrix(self):
+		dense = ear.Matrix(3, 4)
+		dense.set_output(1, 2, 0.5)
+		dense.set_output(3, 0, 1)
+
+		sparse = ear.SparseMatrix.from_dense(dense)
+		self.assertEqual(2, sparse.nnz)
+		self.assertEqual([0, 0, 0.5], sparse.get_output_vector(1))
+		self.assertEqual(dense.flatten(), sparse.to_dense().flatten())
+
+		rows = sparse.copy()
+		rows.set_output_vectors([3, 0], [[0, 0.25, 0], [1, 0, 2]])
+		self.assertEqual([[1, 0, 2], [0, 0, 0.5], [0] * 3, [0, 0.25, 0]], rows.to_dense().matrix.tolist())
+		self.assertEqual(4, rows.nnz)
+
+		changed = sparse.copy()
+		changed.set_output(2, 1, 0.25)
+		changed.set_output(3, 0, 0)
+		self.assertEqual([2, 3], changed.changed_outputs(sparse).tolist())
+		self.assertEqual([], sparse.changed_outputs(sparse.copy()).tolist())
+
+	def test_sparse_upload(self):
+		uploads = []
+
+		class Control(object):
+			def set_mix_matrix(self, matrix, rows, cols, hop=0):
+				uploads.append((matrix.matrix.copy(), rows, cols, hop))
+
+		sparse = ear.SparseMatrix(2, 2)
+		sparse.set_output(0, 1, 1)
+		dense = sparse.upload(Control(), ear.Matrix(4, 2))
+		self.assertEqual((2, 2, 4), uploads[-1][1:])
+
+		previous = sparse.copy()
+		sparse.upload(Control(), dense, previous)
+		self.assertEqual(1, len(uploads))
+
+		sparse.set_output(1, 0, 0.5)
+		sparse.upload(Control(), dense, previous)
+		self.assertEqual([[0, 1, 0, 0], [0.5, 0, 0, 0]], uploads[-1][0].tolist())
+
+class TestZone(unittest.TestCase):
+	def setUp(self):
+		self.router = types.SimpleNamespace(num_speakers=4)
+		self.router.speakers = ear.SpeakerGroup(self.router, [ear.Speaker(self.router, i) for i in range(4)])
+
+	def group(self, *indices):
+		return ear.SpeakerGroup(self.router, [self.router.speakers.speakers[i] for i in indices])
+
+	def test_zone_gains(self):
+		root = ear.Zone(self.group(0), 'root')
+		child = ear.Zone(self.group(2, 3), 'child')
+		leaf = ear.Zone(self.group(3), 'leaf')
+
+		child.add_zone(leaf)
+		root.add_zone(child)
+		self.assertEqual([1, 0, 1, 1], root.gains.tolist())
+
+		version = root.version
+		cached = child.gains
+		leaf.gain = 2
+		self.assertGreater(root.version, version)
+		self.assertEqual([1, 0, 1, 2], root.gains.tolist())
+
+		root.remove_zone(child)
+		self.assertEqual([1, 0, 0, 0], root.gains.tolist())
+		self.assertEqual([0, 0, 1, 2], child.gains.tolist())
+		self.assertIsNot(cached, child.gains)
+
+		with self.assertRaises(Exception):
+			leaf.add_zone(child)
+
+	def test_group_membership(self):
+		group = self.group(0)
+		zone = ear.Zone(group, 'zone')
+		self.assertEqual([1, 0, 0, 0], zone.gains.tolist())
+
+		version = zone.version
+		group.add_speaker(self.router.speakers.speakers[2])
+		self.assertEqual(1, group.version)
+		self.assertGreater(zone.version, version)
+		self.assertEqual([1, 0, 1, 0], zone.gains.tolist())
+
+		group.remove_speaker(self.router.speakers.speakers[0])
+		self.assertEqual([0, 0, 1, 0], zone.gains.tolist())
+
+		with self.assertRaises(Exception):
+			group.remove_speaker(self.router.speakers.speakers[0])
+
+	def test_mix_recipes(self):
+		group = self.group(1, 2)
+		zone = ear.Zone(self.group(3), 'zone')
+
+		matrix = group.get_mix(2)
+		self.assertIs(matrix, group.get_mix(2))
+		self.assertEqual([0, 0, 1, 1, 1, 1, 0, 0], matrix.matrix.flatten().tolist())
+
+		zone_matrix = group.get_mix(2, zones=[zone])
+		self.assertEqual([0, 0, 0, 0, 0, 0, 1, 1], zone_matrix.matrix.flatten().tolist())
+
+		zone.gain = 0.5
+		self.assertIsNot(zone_matrix, group.get_mix(2, zones=[zone]))
+		self.assertEqual((1, 3), (group.mix_recipes.hits, group.mix_recipes.misses))
+
+		group.add_speaker(self.router.speakers.speakers[0])
+		self.assertEqual([1, 1, 1, 1, 1, 1, 0, 0], group.get_mix(2).matrix.flatten().tolist())
+
+	def test_mix_recipe_eviction(self):
+		cache = ear.MixRecipeCache(max_bytes=2 * 4 * 4)
+
+		cache.get('a', lambda: ear.Matrix(2, 2))
+		cache.get('b', lambda: ear.Matrix(2, 2))
+		cache.get('a', lambda: ear.Matrix(2, 2))
+		cache.get('c', lambda: ear.Matrix(2, 2))
+
+		self.assertIn('a', cache)
+		self.assertNotIn('b', cache)
+		self.assertEqual(32, cache.bytes)
+		self.assertEqual(1, cache.evictions)
+
+class TestDriverRegistry(unittest.TestCase):
+	def setUp(self):
+		class System(object):
+			num_drivers = 2
+			builds = 0
+			callbacks = 0
+
+			def set_callback(self, callback, type):
+				self.callbacks += 1
+
+			def get_driver_info(self, index):
+				if index == 0:
+					self.builds += 1
+				return types.SimpleNamespace(guid=types.SimpleNamespace(data1=index))
+
+		self.system = System()
+
+	def test_device_list_changes(self):
+		registry = ear.DriverRegistry(self.system)
+		self.assertEqual(1, self.system.callbacks)
+
+		driver = registry.get_by_index(1)
+		self.assertIs(driver, registry.get(str(driver.id)))
+		self.assertEqual(1, self.system.builds)
+
+		registry._device_list_changed(None, None, None, None, None)
+		registry.drivers()
+		self.assertEqual(2, self.system.builds)
+
+	def test_max_age(self):
+		registry = ear.DriverRegistry(self.system, max_age=60)
+		self.assertEqual(0, self.system.callbacks)
+
+		registry.drivers()
+		registry.drivers()
+		self.assertEqual(1, self.system.builds)
+
+		registry._built -= 61
+		registry.drivers()
+		self.assertEqual(2, self.system.builds)
+
+class TestSoundCache(unittest.TestCase):
+	def setUp(self):
+		class Sound(object):
+			def __init__(self, system, size):
+				self.system = system
+				self.size = size
+				self.released = False
+				self.channel = types.SimpleNamespace(is_playing=False, sound=self)
+
+			def play(self, channel_group=None, paused=False):
+				return self.channel
+
+			def release(self):
+				self.released = True
+				self.system.sound_ram.current -= self.size
+
+		class System(object):
+			sound_ram = types.SimpleNamespace(current=0)
+
+			def create_sound(self, path, exinfo=None, **args):
+				size = 64 if path == 'big' else 16
+				self.sound_ram.current += size
+				return Sound(self, size)
+
+			async def load_sound(self, path, exinfo=None, **args):
+				await asyncio.sleep(0)
+				return self.create_sound(path, exinfo, **args)
+
+		self.system = System()
+
+	def test_sound_cache(self):
+		cache = ear.SoundCache(self.system, max_bytes=32)
+
+		a = cache.play('a')
+		cache.play('b')
+		self.assertIs(cache.get('a'), cache.get('a'))
+		cache.get('c')
+
+		self.assertIn(cache.key('a'), cache)
+		self.assertNotIn(cache.key('b'), cache)
+		self.assertEqual(32, cache.bytes)
+
+		# Playing sounds are kept over the budget
+		a.is_playing = True
+		cache.play('d')
+		self.assertIn(cache.key('a'), cache)
+		self.assertNotIn(cache.key('c'), cache)
+
+		stats = cache.stats()
+		self.assertEqual((2, 4, 2), (stats['hits'], stats['misses'], stats['evictions']))
+		self.assertEqual(2 / 6, stats['hit_rate'])
+
+	def test_sound_cache_prune(self):
+		cache = ear.SoundCache(self.system)
+		sound = cache.get('a')
+		sound.play = lambda channel_group=None, paused=False: types.SimpleNamespace(is_playing=False)
+
+		for i in range(10):
+			cache.play('a')
+
+		# Only the channel just started is tracked, the finished ones are dropped
+		self.assertEqual(1, len(cache._sounds[cache.key('a')].channels))
+
+	def test_sound_cache_load(self):
+		class System(object):
+			sound_ram = types.SimpleNamespace(current=0)
+			loads = 0
+
+			async def load_sound(self, path, exinfo=None, **args):
+				self.loads += 1
+				await asyncio.sleep(0)
+				return types.SimpleNamespace(path=path)
+
+		system = System()
+		cache = ear.SoundCache(system)
+
+		async def load():
+			return await asyncio.gather(cache.load('a'), cache.load('a'))
+
+		a, b = asyncio.run(load())
+		self.assertIs(a, b)
+		self.assertIs(a, cache.get('a'))
+		self.assertEqual(1, system.loads)
+		self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+	def test_sound_cache_load_created(self):
+		cache = ear.SoundCache(self.system)
+
+		async def load():
+			loading = asyncio.ensure_future(cache.load('a'))
+			await asyncio.sleep(0)
+			# Created while the load is still waiting on FMOD
+			sound = cache.get('a')
+			return sound, await loading
+
+		sound, loaded = asyncio.run(load())
+		self.assertIs(sound, loaded)
+		self.assertEqual(16, cache.bytes)
+		self.assertEqual(16, self.system.sound_ram.current)
+
+	def test_sound_cache_playing(self):
+		cache = ear.SoundCache(self.system, max_bytes=32)
+
+		cache.play('a').is_playing = True
+		cache.play('b').is_playing = True
+
+		# Nothing can be evicted, the new sound is cached over the budget
+		sound = cache.get('c')
+		self.assertFalse(sound.released)
+		self.assertIn(cache.key('c'), cache)
+		self.assertEqual(48, cache.bytes)
+		self.assertEqual(0, cache.evictions)
+
+	def test_sound_cache_too_big(self):
+		cache = ear.SoundCache(self.system, max_bytes=32)
+
+		channel = cache.play('big')
+		channel.is_playing = True
+		self.assertNotIn(cache.key('big'), cache)
+		self.assertEqual(0, cache.bytes)
+
+		cache.play('a')
+		sound = cache.get('big')
+		self.assertFalse(sound.released)
+		self.assertNotIn(cache.key('big'), cache)
+
+		# Released once it stopped playing
+		channel.is_playing = False
+		cache.play('a')
+		self.assertTrue(channel.sound.released)
+		self.assertFalse(sound.released)
+
+class TestChannel(unittest.TestCase):
+	def setUp(self):
+		self.uploads = []
+		uploads = self.uploads
+
+		class Group(object):
+			def __init__(self):
+				self.volume = 1
+				self.fade_points = []
+				self.dsp_clock = types.SimpleNamespace(parent_clock=1000)
+
+			def set_mix_matrix(self, matrix, rows, cols, hop=0):
+				uploads.append(matrix.matrix.copy())
+
+			def add_fade_point(self, clock, volume):
+				self.fade_points.append((clock, volume))
+
+			def remove_fade_points(self, start, end):
+				self.fade_points = [point for point in self.fade_points if not start <= point[0] <= end]
+
+		self.locks = []
+		locks = self.locks
+
+		class System(object):
+			software_format = types.SimpleNamespace(sample_rate=1000, raw_speakers=0, speaker_mode=0)
+
+			def set_callback(self, callback, type):
+				pass
+
+			def init(self):
+				pass
+
+			def create_channel_group(self, name):
+				return Group()
+
+			def lock_dsp(self):
+				locks.append('lock')
+
+			def unlock_dsp(self):
+				locks.append('unlock')
+
+		self.router = ear.Router(4, fmod_system=System())
+
+	def start(self):
+		self.router.start()
+		del self.uploads[:]
+
+	def zone(self, *indices):
+		group = ear.SpeakerGroup(self.router, [self.router.speakers.speakers[i] for i in indices])
+		return ear.Zone(group, 'zone')
+
+	def test_mix(self):
+		channel = ear.Channel(self.router)
+		zone = self.zone(1, 2)
+		channel.attach_zone(zone)
+
+		channel._update_mix()
+		self.assertIsInstance(channel.mix, ear.SparseMatrix)
+		self.assertEqual(8, channel.mix.nnz)
+		self.assertEqual([[0] * 4, [1] * 4, [1] * 4, [0] * 4], self.uploads[-1].tolist())
+
+		channel._update_mix()
+		self.assertEqual(1, len(self.uploads))
+
+		zone.gain = 0.5
+		channel._update_mix()
+		self.assertEqual([0, 0.5, 0.5, 0], self.uploads[-1][:, 0].tolist())
+
+	def test_batch_commit(self):
+		self.start()
+		channel = ear.Channel(self.router)
+		channel.attach_zone(self.zone(0))
+		self.router.speakers.speakers[0].volume = 1
+
+		with self.router.batch() as batch:
+			channel._update_mix()
+			self.router._update_volume()
+			self.assertEqual(2, len(batch))
+			self.assertEqual([], self.uploads)
+
+		self.assertEqual(2, len(self.uploads))
+		self.assertEqual(['lock', 'unlock'], self.locks)
+		self.assertIsNone(self.router._batch)
+
+		with self.router.batch():
+			channel._update_mix()
+			self.router._update_volume()
+
+		self.assertEqual(2, len(self.uploads))
+
+	def test_batch_abort(self):
+		self.start()
+		channel = ear.Channel(self.router)
+		channel.attach_zone(self.zone(0))
+		self.router.speakers.speakers[0].volume = 1
+
+		with self.assertRaises(ValueError):
+			with self.router.batch():
+				channel._update_mix()
+				self.router._update_volume()
+				raise ValueError()
+
+		self.assertEqual([], self.uploads)
+		self.assertEqual([], self.locks)
+		self.assertIsNone(self.router._batch)
+
+		with self.router.batch():
+			channel._update_mix()
+			self.router._update_volume()
+
+		self.assertEqual(2, len(self.uploads))
+		self.assertEqual([1, 1, 1, 1], self.uploads[0][0].tolist())
+		self.assertEqual([1, 0, 0, 0], self.uploads[1][0].tolist())
+
+	def test_batch_commit_fails(self):
+		self.start()
+		channel = ear.Channel(self.router)
+		channel.attach_zone(self.zone(0))
+
+		def fail(matrix, rows, cols, hop=0):
+			raise ValueError()
+		channel.output.set_mix_matrix = fail
+
+		with self.assertRaises(ValueError):
+			with self.router.batch():
+				channel._update_mix()
+
+		self.assertEqual(['lock', 'unlock'], self.locks)
+		self.assertFalse(channel._mix_pushed)
+		self.assertTrue(channel._dirty.all())
+
+	def test_ramp_volume(self):
+		channel = ear.Channel(self.router)
+
+		# Not started, there is no clock to schedule on
+		channel.ramp_volume(0.5, 1)
+		self.assertEqual(0.5, channel.output.volume)
+		self.assertEqual([], channel.output.fade_points)
+
+		self.start()
+		channel.ramp_volume(1, 1)
+		self.assertEqual(1, channel.output.volume)
+		self.assertEqual([(1000, 0.5), (2000, 1)], channel.output.fade_points)
+
+		# Halfway through, the next ramp starts from the level reached
+		channel.output.dsp_clock.parent_clock = 1500
+		channel.ramp_volume(0, 0.5)
+		self.assertEqual([(1000, 0.5), (1500, 0.75), (2000, 0)], channel.output.fade_points)
+
+		channel.ramp_volume(0.25, 0)
+		self.assertEqual(0.25, channel.output.volume)
+		self.assertEqual([], channel.output.fade_points)
+
+	def test_ramp_in_batch(self):
+		self.start()
+		channel = ear.Channel(self.router)
+
+		with self.router.batch():
+			channel.ramp_volume(0.5, 1)
+			self.assertEqual([], channel.output.fade_points)
+
+		self.assertEqual(['lock', 'unlock'], self.locks)
+		self.assertEqual([(1000, 1), (2000, 0.5)], channel.output.fade_points)
+
+		# A dropped ramp leaves the level the previous one reaches
+		with self.assertRaises(ValueError):
+			with self.router.batch():
+				channel.ramp_volume(0, 0)
+				raise ValueError()
+
+		self.assertEqual(0.5, channel._fade_level(2000))
+
+	def test_ramp_mix_gain(self):
+		self.start()
+		channel = ear.Channel(self.router)
+
+		matrix = numpy.zeros((4, 4), dtype=numpy.float32)
+		matrix[1] = 0.5
+		matrix[2] = 0.25
+		channel.ramp_mix_gain(matrix, 1)
+
+		self.assertEqual([0, 1, 0.5, 0], self.uploads[-1][:, 0].tolist())
+		self.assertEqual([(1000, 1), (2000, 0.5)], channel.output.fade_points)
+
+class TestSoundLoader(unittest.TestCase):
+	def setUp(self):
+		released = self.released = []
+
+		class Sound(object):
+			def __init__(self, ptr):
+				self._ptr = ctypes.c_void_p(ptr)
+				self.state = OPENSTATE.LOADING
+
+			@property
+			def open_state(self):
+				return types.SimpleNamespace(state=self.state)
+
+			def release(self):
+				released.append(self)
+
+		class System(object):
+			def __init__(self):
+				self.sounds = []
+				# Result reported before create_sound returns, if any
+				self.early = None
+
+			def create_sound(self, name, mode, exinfo):
+				sound = Sound(len(self.sounds) + 1)
+				self.sounds.append(sound)
+				if self.early is not None:
+					exinfo.nonblockcallback(sound._ptr.value, self.early.value)
+				return sound
+
+		self.system = System()
+		self.loader = SoundLoader(self.system, max_loads=2, poll_interval=0.01)
+
+	def finish(self, sound, result=RESULT.OK):
+		# What FMOD's loading thread does once it opened the sound
+		self.loader._callback(sound._ptr.value, result.value)
+
+	async def created(self, count):
+		while len(self.system.sounds) < count:
+			await asyncio.sleep(0)
+		return self.system.sounds[count - 1]
+
+	def assertIdle(self):
+		self.assertEqual(0, self.loader.loading)
+		self.assertEqual({}, self.loader._pending)
+		self.assertEqual({}, self.loader._early)
+
+	def test_callback(self):
+		async def load():
+			loading = asyncio.ensure_future(self.loader.load('a'))
+			self.finish(await self.created(1))
+			return await loading
+
+		sound = asyncio.run(load())
+		self.assertIs(self.system.sounds[0], sound)
+		self.assertIdle()
+
+	def test_early_callback(self):
+		self.system.early = RESULT.OK
+
+		sound = asyncio.run(self.loader.load('a'))
+		self.assertIs(self.system.sounds[0], sound)
+		self.assertIdle()
+
+	def test_poll(self):
+		async def load():
+			loading = asyncio.ensure_future(self.loader.load('a'))
+			# No callback, open_state tells it is done
+			(await self.created(1)).state = OPENSTATE.READY
+			return await loading
+
+		sound = asyncio.run(load())
+		self.assertIs(self.system.sounds[0], sound)
+		self.assertIdle()
+
+	def test_failure(self):
+		async def load():
+			loading = asyncio.ensure_future(self.loader.load('a'))
+			self.finish(await self.created(1), RESULT.FILE_NOTFOUND)
+			return await loading
+
+		with self.assertRaises(FmodError) as cm:
+			asyncio.run(load())
+		self.assertEqual(RESULT.FILE_NOTFOUND, cm.exception.result)
+		self.assertEqual(self.system.sounds, self.released)
+		self.assertIdle()
+
+	def test_max_loads(self):
+		async def load():
+			loads = [asyncio.ensure_future(self.loader.load(name)) for name in 'abc']
+			await self.created(2)
+			for i in range(10):
+				await asyncio.sleep(0)
+			self.assertEqual(2, len(self.system.sounds))
+			self.assertEqual(2, self.loader.loading)
+
+			# The third load starts once one of the first two finished
+			self.finish(self.system.sounds[0])
+			self.finish(await self.created(3))
+			self.finish(self.system.sounds[1])
+			return await asyncio.gather(*loads)
+
+		sounds = asyncio.run(load())
+		self.assertEqual(self.system.sounds, sounds)
+		self.assertIdle()
+
+	def test_cancel(self):
+		async def load():
+			loading = asyncio.ensure_future(self.loader.load('a'))
+			sound = await self.created(1)
+			loading.cancel()
+			with self.assertRaises(asyncio.CancelledError):
+				await loading
+
+			# FMOD keeps opening it, the sound is released once it is open
+			self.assertEqual([], self.released)
+			self.finish(sound)
+			for i in range(10):
+				await asyncio.sleep(0)
+
+		asyncio.run(load())
+		self.assertEqual(self.system.sounds, self.released)
+		self.assertIdle()
+
+class TestRingBuffer(unittest.TestCase):
+	def read(self, ring, length):
+		out = ctypes.create_string_buffer(length)
+		ring.read_into(ctypes.addressof(out), length)
+		return out.raw
+
+	def test_wrap_around(self):
+		ring = RingBuffer(8)
+
+		self.assertEqual(6, ring.write(b'abcdef'))
+		self.assertEqual(b'abcd', self.read(ring, 4))
+		self.assertEqual(6, ring.free)
+
+		# Wraps past the end of the buffer
+		self.assertEqual(6, ring.write(b'ghijklmn'))
+		self.assertEqual(0, ring.free)
+		self.assertEqual(b'efghijkl', self.read(ring, 8))
+		self.assertEqual(0, ring.underruns)
+
+	def test_granularity(self):
+		ring = RingBuffer(8)
+
+		self.assertEqual(6, ring.write(b'abcdefg', granularity=3))
+		self.assertEqual(0, ring.write(b'hij', granularity=3))
+		self.assertEqual(6, ring.available)
+
+	def test_underrun(self):
+		ring = RingBuffer(8)
+		ring.write(b'abc')
+
+		self.assertEqual(b'abc\0\0', self.read(ring, 5))
+		self.assertEqual(1, ring.underruns)
+		self.assertEqual(0, ring.available)
+
+		self.assertEqual(b'\0\0', self.read(ring, 2))
+		self.assertEqual(2, ring.underruns)
+
+class TestPyDSP(unittest.TestCase):
+	def read(self, dsp, inbuffer, outbuffer):
+		"""Run one block through the read callback FMOD would call"""
+		outchannels = ctypes.c_int(outbuffer.shape[1])
+		return dsp._read_callback(None, inbuffer.ctypes.data, outbuffer.ctypes.data, len(inbuffer), inbuffer.shape[1], ctypes.byref(outchannels))
+
+	def test_pass_through(self):
+		dsp = PyDSP()
+		inbuffer = numpy.arange(8, dtype=numpy.float32).reshape(4, 2)
+		outbuffer = numpy.ones((4, 3), dtype=numpy.float32)
+
+		self.assertEqual(0, self.read(dsp, inbuffer, outbuffer))
+		self.assertEqual(inbuffer.tolist(), outbuffer[:, :2].tolist())
+		self.assertEqual([0] * 4, outbuffer[:, 2].tolist())
+
+	def test_process(self):
+		class Gain(PyDSP):
+			def process(self, inbuffer, outbuffer):
+				outbuffer[:] = inbuffer * 0.5
+
+		dsp = Gain()
+		inbuffer = numpy.ones((4, 2), dtype=numpy.float32)
+		outbuffer = numpy.zeros((4, 2), dtype=numpy.float32)
+
+		self.read(dsp, inbuffer, outbuffer)
+		self.assertEqual([[0.5, 0.5]] * 4, outbuffer.tolist())
+
+		# Exceptions are kept and reported to FMOD as an error
+		self.assertNotEqual(0, self.read(dsp, inbuffer, numpy.zeros((4, 3), dtype=numpy.float32)))
+		self.assertIsInstance(dsp.error, ValueError)
+
+class TestRecord(unittest.TestCase):
+	def setUp(self):
+		self.Point = record("Point", ["x", "y"])
+
+	def test_record(self):
+		point = self.Point(1, 2)
+		self.assertEqual(point, self.Point(y=2, x=1))
+		self.assertEqual((1, 2), (point.x, point.y))
+		self.assertEqual(2, point['y'])
+		self.assertEqual(1, point[0])
+		self.assertRaises(KeyError, lambda: point['z'])
+
+		x, y = point
+		self.assertEqual((1, 2), (x, y))
+		self.assertEqual(['x', 'y'], list(point.keys()))
+		self.assertEqual({'x': 1, 'y': 2}, dict(point._asdict()))
+
+	def test_record_arity(self):
+		self.assertRaises(TypeError, self.Point, 1)
+		self.assertRaises(TypeError, self.Point, 1, 2, 3)
+		self.assertRaises(TypeError, self.Point, x=1)
+		self.assertRaises(TypeError, self.Point, x=1, y=2, z=3)
+		self.assertRaises(TypeError, self.Point, 1, y=2)
+
+class TestPanning(unittest.TestCase):
+	def setUp(self):
+		angles = numpy.radians([0, 90, 180, 270])
+		self.layout = panning.Layout(numpy.stack((numpy.cos(angles), numpy.sin(angles)), axis=1))
+
+	def test_vbap(self):
+		gains = panning.VBAPPanner(self.layout).gains([[1, 0], [1, 1], [0, -2]])
+
+		numpy.testing.assert_allclose(gains, [
+			[1, 0, 0, 0],
+			[0.5 ** 0.5, 0.5 ** 0.5, 0, 0],
+			[0, 0, 0, 1]
+		], atol=1e-6)
+
+	def test_dbap(self):
+		gains = panning.DBAPPanner(self.layout).gains([[0, 0], [1, 0]])
+
+		numpy.testing.assert_allclose(gains[0], [0.5] * 4, atol=1e-6)
+		numpy.testing.assert_allclose((gains ** 2).sum(axis=1), [1, 1], atol=1e-6)
+		self.assertEqual(0, numpy.argmax(gains[1]))
+
 
 if __name__ == '__main__':
 	unittest.main()